@@ -623,6 +623,10 @@ app.whenReady().then(async () => {
   createWindow();
 });
 
+app.on('will-quit', () => {
+  stopPythonWorker();
+});
+
 app.on('window-all-closed', () => {
   if (process.platform !== 'darwin') {
     app.quit();
@@ -732,76 +736,70 @@ function checkPythonDependencies() {
   });
 }
 
-// Execute Python command
-function executePython(command, args) {
-  return new Promise((resolve, reject) => {
-    // Ensure userSettings is loaded before executing Python
-    if (!userSettings) {
-      reject(new Error('User settings not initialized. Please restart the application.'));
-      return;
-    }
+// Build the spawn command, arguments and options for an ARGUS_core invocation
+function getPythonSpawnSpec(command, args) {
+  // Ensure userSettings is loaded before executing Python
+  if (!userSettings) {
+    throw new Error('User settings not initialized. Please restart the application.');
+  }
 
-    const pythonPath = getPythonPath();
-    const appRoot = getAppRootDir();
+  const pythonPath = getPythonPath();
+  const appRoot = getAppRootDir();
 
-    let spawnCommand = pythonPath;
-    let spawnArgs;
+  let spawnCommand = pythonPath;
+  let spawnArgs;
 
-    // Check if using bundled Python executable (production)
-    // Check if path ends with ARGUS_core.exe or ARGUS_core (bundled executable name)
-    // This works whether it's at root level or in python-dist subdirectory
-    const isBundledExe = pythonPath && (pythonPath.endsWith('ARGUS_core.exe') || pythonPath.endsWith('ARGUS_core'));
+  // Check if using bundled Python executable (production)
+  // Check if path ends with ARGUS_core.exe or ARGUS_core (bundled executable name)
+  // This works whether it's at root level or in python-dist subdirectory
+  const isBundledExe = pythonPath && (pythonPath.endsWith('ARGUS_core.exe') || pythonPath.endsWith('ARGUS_core'));
 
-    if (isBundledExe) {
-      // Bundled executable: Python interpreter and script are already compiled in
-      // Just pass the command and arguments directly
-      spawnArgs = [command, ...args];
-      console.log('[ARGUS] Using bundled Python executable');
-    } else {
-      // Development mode: Call Python interpreter with script
-      const scriptPath = path.join(appRoot, 'python', 'ARGUS_core.py');
+  if (isBundledExe) {
+    // Bundled executable: Python interpreter and script are already compiled in
+    // Just pass the command and arguments directly
+    spawnArgs = [command, ...args];
+    console.log('[ARGUS] Using bundled Python executable');
+  } else {
+    // Development mode: Call Python interpreter with script
+    const scriptPath = path.join(appRoot, 'python', 'ARGUS_core.py');
 
-      // Check if script exists
-      if (!fs.existsSync(scriptPath)) {
-        console.error('[ARGUS] ERROR: Python script not found at:', scriptPath);
-        reject(new Error(`Python script not found at: ${scriptPath}`));
-        return;
-      }
+    // Check if script exists
+    if (!fs.existsSync(scriptPath)) {
+      console.error('[ARGUS] ERROR: Python script not found at:', scriptPath);
+      throw new Error(`Python script not found at: ${scriptPath}`);
+    }
 
-      // Set working directory to app root so Python finds templates there
-      const pythonArgs = [scriptPath, command, ...args];
-      spawnArgs = pythonArgs;
-
-      // On macOS, detect hardware architecture and run Python natively
-      // This prevents arm64/x86_64 mismatch with Python packages like numpy
-      if (process.platform === 'darwin') {
-        try {
-          const { execSync } = require('child_process');
-          const hardwareArch = execSync('uname -m').toString().trim();
-          console.log('[ARGUS] Hardware architecture:', hardwareArch);
-          console.log('[ARGUS] Electron process architecture:', process.arch);
-
-          // Run Python in native hardware architecture to avoid package conflicts
-          // Example: If on Apple Silicon (arm64) but Electron is x86_64, run Python as arm64
-          spawnCommand = 'arch';
-          spawnArgs = [`-${hardwareArch}`, pythonPath, ...pythonArgs];
-          console.log('[ARGUS] Using arch command to run Python natively');
-        } catch (error) {
-          console.error('[ARGUS] Failed to detect architecture, using default Python:', error.message);
-        }
+    // Set working directory to app root so Python finds templates there
+    const pythonArgs = [scriptPath, command, ...args];
+    spawnArgs = pythonArgs;
+
+    // On macOS, detect hardware architecture and run Python natively
+    // This prevents arm64/x86_64 mismatch with Python packages like numpy
+    if (process.platform === 'darwin') {
+      try {
+        const { execSync } = require('child_process');
+        const hardwareArch = execSync('uname -m').toString().trim();
+        console.log('[ARGUS] Hardware architecture:', hardwareArch);
+        console.log('[ARGUS] Electron process architecture:', process.arch);
+
+        // Run Python in native hardware architecture to avoid package conflicts
+        // Example: If on Apple Silicon (arm64) but Electron is x86_64, run Python as arm64
+        spawnCommand = 'arch';
+        spawnArgs = [`-${hardwareArch}`, pythonPath, ...pythonArgs];
+        console.log('[ARGUS] Using arch command to run Python natively');
+      } catch (error) {
+        console.error('[ARGUS] Failed to detect architecture, using default Python:', error.message);
       }
     }
+  }
 
-    // Use exe directory as working directory for template and output file access
-    const exeDir = getExeDir();
-    const workDir = exeDir;
+  // Use exe directory as working directory for template and output file access
+  const workDir = getExeDir();
 
-    console.log('[ARGUS] Executing Python command:', command);
-    console.log('[ARGUS] Spawn command:', spawnCommand);
-    console.log('[ARGUS] Spawn args:', spawnArgs);
-    console.log('[ARGUS] Working directory:', workDir);
-
-    const pythonProcess = spawn(spawnCommand, spawnArgs, {
+  return {
+    spawnCommand,
+    spawnArgs,
+    options: {
       cwd: workDir,  // Set working directory to exe directory
       env: {
         ...process.env,
@@ -810,7 +808,187 @@ function executePython(command, args) {
         ARGUS_BUNDLED_TEMPLATES: path.join(appRoot, 'templates'),
         ARGUS_OUTPUT_DIR: userSettings.outputDir
       }
-    });
+    }
+  };
+}
+
+// Persistent ARGUS_core worker ("serve" mode)
+// Keeps Python, its modules and the loaded templates warm between IPC calls.
+// Requests and results are newline-delimited JSON matched by id.
+let pythonWorker = null;
+let pythonWorkerFailed = false;
+
+// Longest a worker request may run before the worker is treated as stuck
+const PYTHON_WORKER_TIMEOUT_MS = 10 * 60 * 1000;
+
+function startPythonWorker() {
+  const { spawnCommand, spawnArgs, options } = getPythonSpawnSpec('serve', []);
+
+  console.log('[ARGUS] Starting persistent Python worker');
+  console.log('[ARGUS] Spawn command:', spawnCommand);
+  console.log('[ARGUS] Spawn args:', spawnArgs);
+
+  const worker = {
+    process: spawn(spawnCommand, spawnArgs, options),
+    pending: new Map(),
+    nextId: 1,
+    served: 0,
+    buffer: ''
+  };
+
+  const failPending = (error) => {
+    for (const { reject, timer } of worker.pending.values()) {
+      clearTimeout(timer);
+      reject(error);
+    }
+    worker.pending.clear();
+    if (pythonWorker === worker) {
+      pythonWorker = null;
+    }
+  };
+
+  // Stop a worker that can no longer be trusted; its pending requests are
+  // retried in one-shot processes and the next request starts a new worker
+  worker.abandon = (reason) => {
+    const error = new Error(reason);
+    error.workerUnusable = false;
+    failPending(error);
+    worker.process.kill();
+  };
+
+  worker.process.stdout.on('data', (data) => {
+    worker.buffer += data.toString();
+
+    let newline;
+    while ((newline = worker.buffer.indexOf('\n')) >= 0) {
+      const line = worker.buffer.slice(0, newline).trim();
+      worker.buffer = worker.buffer.slice(newline + 1);
+      if (!line) {
+        continue;
+      }
+
+      let result;
+      try {
+        result = JSON.parse(line);
+      } catch (error) {
+        // The reply cannot be matched to its request
+        console.error('[ARGUS] Failed to parse Python worker output:', line);
+        worker.abandon(`Failed to parse Python worker output: ${line}`);
+        return;
+      }
+
+      const request = worker.pending.get(result.id);
+      if (!request) {
+        continue;
+      }
+      worker.pending.delete(result.id);
+      clearTimeout(request.timer);
+      worker.served++;
+      delete result.id;
+
+      if (result.status === 'error') {
+        request.reject(new Error(result.error));
+      } else {
+        console.log('[ARGUS] Python command succeeded');
+        request.resolve(result);
+      }
+    }
+  });
+
+  worker.process.stderr.on('data', (data) => {
+    console.log('[ARGUS] Python worker stderr:', data.toString());
+  });
+
+  worker.process.on('close', (code) => {
+    console.log('[ARGUS] Python worker exited with code:', code);
+    const error = new Error(`Python worker exited with code ${code}`);
+    // A worker that never answered a request is not usable (e.g. an older ARGUS_core without serve mode)
+    error.workerUnusable = worker.served === 0;
+    failPending(error);
+  });
+
+  worker.process.on('error', (error) => {
+    console.error('[ARGUS] Failed to start Python worker:', error);
+    const startError = new Error(`Failed to start Python: ${error.message}`);
+    startError.workerUnusable = true;
+    failPending(startError);
+  });
+
+  return worker;
+}
+
+function stopPythonWorker() {
+  if (pythonWorker) {
+    pythonWorker.process.stdin.end();
+    pythonWorker = null;
+  }
+}
+
+// Send a command to the persistent worker, starting it if needed
+function executePythonWorker(command, args) {
+  return new Promise((resolve, reject) => {
+    try {
+      if (!pythonWorker) {
+        pythonWorker = startPythonWorker();
+      }
+    } catch (error) {
+      reject(error);
+      return;
+    }
+
+    const worker = pythonWorker;
+    const id = worker.nextId++;
+    const timer = setTimeout(() => {
+      if (!worker.pending.delete(id)) {
+        return;
+      }
+      console.error('[ARGUS] Python worker timed out on command:', command);
+      reject(new Error(`Python command ${command} timed out after ${PYTHON_WORKER_TIMEOUT_MS / 1000} s`));
+      worker.abandon(`Python worker restarted after ${command} timed out`);
+    }, PYTHON_WORKER_TIMEOUT_MS);
+    worker.pending.set(id, { resolve, reject, timer });
+
+    console.log('[ARGUS] Executing Python command (worker):', command);
+    worker.process.stdin.write(JSON.stringify({ id, command, args }) + '\n');
+  });
+}
+
+// Execute Python command
+// Uses the persistent worker, falling back to a one-shot process if the worker cannot run
+async function executePython(command, args) {
+  if (!pythonWorkerFailed) {
+    try {
+      return await executePythonWorker(command, args);
+    } catch (error) {
+      if (error.workerUnusable === undefined) {
+        throw error;
+      }
+      console.warn('[ARGUS] Python worker unavailable, falling back to one-shot process:', error.message);
+      pythonWorkerFailed = error.workerUnusable;
+    }
+  }
+
+  return executePythonOnce(command, args);
+}
+
+// Execute Python command in a fresh process
+function executePythonOnce(command, args) {
+  return new Promise((resolve, reject) => {
+    let spec;
+    try {
+      spec = getPythonSpawnSpec(command, args);
+    } catch (error) {
+      reject(error);
+      return;
+    }
+    const { spawnCommand, spawnArgs, options } = spec;
+
+    console.log('[ARGUS] Executing Python command:', command);
+    console.log('[ARGUS] Spawn command:', spawnCommand);
+    console.log('[ARGUS] Spawn args:', spawnArgs);
+    console.log('[ARGUS] Working directory:', options.cwd);
+
+    const pythonProcess = spawn(spawnCommand, spawnArgs, options);
 
     let stdout = '';
     let stderr = '';
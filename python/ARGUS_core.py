@@ -7,16 +7,58 @@ With proper color scale ordering (blue to red for wave heights)
 import sys
 import json
 import os
-import imageio.v2 as imageio
-import cv2 as cv
-import numpy as np
-import yaml
+import time
+import importlib
 
 # Add path for module imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-import plot
-import textCompression as tc
-import buildConfig as bc
+
+# Heavy dependencies (OpenCV, imageio, numpy) are imported inside the
+# functions that use them, so light commands such as list-templates start
+# quickly. This table lists what each command needs; main() imports it up
+# front so --startup-report can attribute import time per module.
+COMMAND_MODULES = {
+    'compress': ['numpy', 'yaml', 'imageio.v2', 'textCompression', 'plot', 'templateCache', 'profiling', 'deltaStore'],
+    'decompress': ['numpy', 'yaml', 'imageio.v2', 'cv2', 'textCompression', 'plot', 'templateCache', 'profiling', 'deltaStore'],
+    'create-template': ['numpy', 'yaml', 'imageio.v2', 'cv2', 'plot'],
+    'compress-batch': ['numpy', 'yaml'],
+    'decompress-dir': ['numpy', 'yaml'],
+    'compress-bundle': ['numpy', 'yaml'],
+    'decompress-bundle': ['numpy', 'yaml'],
+    'decompress-stream': ['numpy', 'yaml', 'imageio.v2', 'cv2', 'textCompression', 'plot', 'templateCache', 'profiling', 'deltaStore'],
+    'list-templates': ['yaml', 'templateIndex'],
+    'metrics': ['numpy', 'yaml'],
+    'serve': ['yaml'],
+}
+
+# Imported by serve once its first reply is out, so the app's startup
+# list-templates request does not wait on OpenCV and numpy
+SERVE_WARM_MODULES = COMMAND_MODULES['decompress'] + ['metrics']
+
+# Seconds spent importing each module through load_modules()
+_import_times = {}
+
+
+def load_modules(names):
+    """
+    Import the named modules, recording how long each one took.
+    Modules that are already loaded are skipped.
+    """
+    for name in names:
+        if name in sys.modules:
+            continue
+        start = time.perf_counter()
+        importlib.import_module(name)
+        _import_times[name] = time.perf_counter() - start
+
+
+def startup_report(stream=sys.stderr):
+    """Print per-module import times recorded by load_modules()"""
+    total = sum(_import_times.values())
+    print('ARGUS_core startup report', file=stream)
+    for name, seconds in sorted(_import_times.items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<16} {seconds * 1000:8.1f} ms", file=stream)
+    print(f"  {'total':<16} {total * 1000:8.1f} ms", file=stream)
 
 
 def find_template_paths(template_name):
@@ -50,10 +92,29 @@ def find_template_paths(template_name):
     raise FileNotFoundError(f"Template '{template_name}' not found in user or bundled templates")
 
 
+def load_template(template_name):
+    """
+    Find a template and load its compiled form (see templateCache.load).
+    Returns dict with 'scale', 'image', 'bounds', 'marker', 'lut_keys', 'lut_vals',
+    'config_path' and 'template_path'. Arrays are read-only.
+    Compiled templates are cached per process and on disk next to the YAML,
+    and rebuilt when the YAML or GIF changes.
+    """
+    import templateCache
+
+    template_gif, template_config = find_template_paths(template_name)
+    return templateCache.load(template_config, template_gif)
+
+
 def create_template(image_path, template_name, scale_coords, crop_coords):
     """
     Create a new template from an image with CORRECT scale extraction
     """
+    import imageio.v2 as imageio
+    import numpy as np
+    import yaml
+    import plot
+
     try:
         # Load image
         if not os.path.exists(image_path):
@@ -106,24 +167,8 @@ def create_template(image_path, template_name, scale_coords, crop_coords):
         # Determine orientation
         is_vertical = (b[1] - b[0]) > (b[3] - b[2])
         
-        # Try multiple positions to extract scale
-        best_scale = []
-        for d in range(2, min(scale_box.shape[0], scale_box.shape[1]), 2):
-            try:
-                if is_vertical:
-                    scale_slice = scale_box[:, d, :]
-                else:
-                    scale_slice = scale_box[d, :, :]
-                
-                extracted = plot.build_scale(scale_slice)
-                if len(extracted) > len(best_scale):
-                    best_scale = extracted
-                    if len(best_scale) >= 15:  # Good enough scale
-                        break
-            except:
-                continue
-        
-        scale = best_scale
+        # Try slices every 2 pixels across the bar, stopping at a good enough scale (15 colors)
+        scale = plot.best_scale(scale_box, is_vertical, 2, 15)
         
         if len(scale) == 0:
             raise ValueError("Could not extract color scale from image")
@@ -141,7 +186,7 @@ def create_template(image_path, template_name, scale_coords, crop_coords):
         
         # Apply colored area identification
         l, r, t, b_coord = plot.lrtb(template_image)
-        plt = plot.gen(template_image, np.array(scale))
+        plt = plot.gen(template_image, np.array(scale), bounds=[l, r, t, b_coord])
         plt = plot.smooth(plt, 2)
         plt = plt // 1
         
@@ -188,14 +233,54 @@ def create_template(image_path, template_name, scale_coords, crop_coords):
         }
 
 
-def compress_image(image_path, template_name, dtg, output_path):
+def encode_frame(image, template, lut, profiler=None, lean=False, bounds=None, n=12, keep_labels=False):
     """
-    Compress image to VLF message format - following original exactly
+    Classify, condition and transform one decoded chart image.
+    Returns (dft, max_coeff); dft is not yet normalized (see encode_image) and
+    holds the coefficients for n per side. keep_labels adds the plot.gen labels
+    as a third item.
+    bounds defaults to plot.lrtb(image).
     """
-    try:
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
-        
+    import numpy as np
+    import textCompression as tc
+    import plot
+    from profiling import stage
+
+    float_type = np.float32 if lean else np.float64
+
+    with stage(profiler, 'gen'):
+        # Generate plot using original method
+        labels = plot.gen(image, template['scale'], lut, bounds, lean)
+    
+    with stage(profiler, 'condition'):
+        # Condition with padding (50 as in original)
+        plt = plot.condition(labels, 50, float_type)
+    
+    # Get max coefficient BEFORE smoothing/processing
+    max_coeff = int(np.max(plt - np.min(plt)) - 1)
+    
+    with stage(profiler, 'dft'):
+        # Build DFT (same values as cv.dft, but only the coefficients the message carries)
+        dft = tc.dft_truncated(plt, n, float_type)
+
+    if keep_labels:
+        return dft, max_coeff, labels
+    return dft, max_coeff
+
+
+def _load_chart(image_path, template_name, profiler=None):
+    """
+    First frame of a chart image, its template (see load_template) and colour lookup table
+    """
+    import imageio.v2 as imageio
+    import numpy as np
+    import templateCache
+    from profiling import stage
+
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+    
+    with stage(profiler, 'load'):
         # Load image
         image_data = imageio.mimread(image_path)
         if isinstance(image_data, list) and len(image_data) > 0:
@@ -203,88 +288,354 @@ def compress_image(image_path, template_name, dtg, output_path):
         else:
             image = imageio.imread(image_path)
         
-        # Convert to array
-        image = np.array(image)
+        # Convert to array (no copy)
+        image = np.asarray(image)
 
+    with stage(profiler, 'template'):
         # Find template in user or bundled templates
-        template_gif, template_config = find_template_paths(template_name)
+        template = load_template(template_name)
+        lut = templateCache.lut(template)
 
-        # Load configuration
-        with open(template_config, 'r') as f:
-            c = yaml.safe_load(f)
-        
-        c['scale'] = np.array(c['scale'])
-        
-        # Generate plot using original method
-        plt = plot.gen(image, c['scale'])
-        
-        # Condition with padding (50 as in original)
-        plt = plot.condition(plt, 50)
-        
-        # Get max coefficient BEFORE smoothing/processing
-        max_coeff = int(np.max(plt - np.min(plt)) - 1)
-        
-        # Build DFT exactly as original
-        dft = cv.dft(plt)
-        
+    return image, template, lut
+
+
+def encode_image(image_path, template_name, dtg, profiler=None, lean=False, base=None, verify=None):
+    """
+    Compress one chart to its message section - following original exactly.
+    Returns (section, max_coeff) where section is the list of lines: the
+    rows/cols/n/max_coeff/DTG/template header line followed by the body.
+    profiler is an optional profiling.StageProfiler timing each stage.
+    lean keeps labels in uint8 and conditions and transforms in float32, for
+    about half the memory; coefficients can land in a neighbouring bin.
+    base is an earlier chart of the template (see deltaStore.load). When given,
+    the chart is sent as the difference to it, with the delta marker and a
+    D<base dtg>/ header field (see textCompression.MSG_DELTA_HEADER), unless
+    that is not shorter than the full message.
+    verify is an optional dict that receives the in-memory round trip of the
+    section (see verify_chart).
+    """
+    import numpy as np
+    import textCompression as tc
+    from profiling import stage
+
+    image, template, lut = _load_chart(image_path, template_name, profiler)
+    
+    if verify is None:
+        dft, max_coeff = encode_frame(image, template, lut, profiler, lean)
+    else:
+        dft, max_coeff, labels = encode_frame(image, template, lut, profiler, lean, keep_labels=True)
+    
+    with stage(profiler, 'normalize'):
         # Normalize DFT
+        # Clip so the largest coefficient is exactly +/-1000: rounding could push it an
+        # ulp past 1000, where coeff_round drops it to zero
         max_dft = np.max(np.abs(dft))
         if max_dft > 0:
-            dft = dft * (1000.0 / max_dft)
-        
+            dft = np.clip(dft * (1000.0 / max_dft), -1000.0, 1000.0)
+    
+    with stage(profiler, 'msgdata_write'):
         # Write message
         msg_data = tc.msgdata_write(dft, 12)
 
-        # Get message template path
-        # First try bundled templates (for packaged app), then user templates
-        bundled_templates = os.environ.get('ARGUS_BUNDLED_TEMPLATES')
-        user_templates = os.environ.get('ARGUS_USER_TEMPLATES', './templates')
+        marker, delta = tc.MSG_HEADER, ''
+        recon = None
+        rows, cols = tc.dft_index(dft.shape[0], 12)
+        if base is not None and base['shape'] == dft.shape and len(base['coeffs']) == len(rows):
+            delta_data, delta_recon = tc.residual_write(dft[rows, cols].astype(np.float64), base['coeffs'])
+            if len(delta_data) < len(msg_data):
+                msg_data, recon = delta_data, delta_recon
+                marker, delta = tc.MSG_DELTA_HEADER, f"D{base['dtg']}/"
+
+    # Header with metadata
+    header = f"{dft.shape[0]}/{dft.shape[1]}/12/{max_coeff}/{dtg}/{template_name}/{marker}/{delta}"
+
+    if verify is not None:
+        if recon is None:
+            recon = tc.coeff_unround_array(tc.coeff_round_array(dft[rows, cols]))
+        with stage(profiler, 'verify'):
+            verify.update(verify_chart(recon, dft.shape, 12, max_coeff, image, labels, template, dtg, lean))
+
+    return [header] + msg_data.splitlines(), max_coeff
+
+
+def _chart_mask(template, shape):
+    """
+    Template marker mask over the chart bounds: the pixels restore_properly paints.
+    Every pixel counts when the chart does not match the template bounds.
+    """
+    import numpy as np
+
+    l, r, t, b = template['bounds']
+    if shape != (b - t, r - l):
+        return np.ones(shape, dtype=bool)
+    return template['marker'][t:b, l:r]
+
+
+# Largest n (coefficients per side) rate control tries
+RATE_MAX_N = 24
+
+
+def encode_rate(image_path, template_name, dtg, max_chars=None, max_lines=None, min_accuracy=None,
+                max_n=RATE_MAX_N, profiler=None, lean=False, verify=None):
+    """
+    Compress one chart choosing n (coefficients per side) for a size budget or
+    a fidelity target. Among the n whose whole message (the section inside the
+    message_envelope lines) fits max_chars characters and max_lines lines, picks the smallest whose decoded labels match the source
+    labels on at least min_accuracy of the chart pixels (those restore_properly
+    paints), or the most accurate one when min_accuracy is not given or not
+    reached.
+    The chart is classified, conditioned and transformed once, at max_n: the
+    coefficients for a smaller n are the first 4n^2 in message order (see
+    textCompression.dft_mapping).
+    Returns (section, max_coeff, rate) where rate holds the chosen 'n', its
+    message 'chars' and 'lines', 'target_met' (None without min_accuracy) and
+    the 'curve' of every n tried as {'n', 'chars', 'lines', 'accuracy'}.
+    verify is an optional dict that receives the in-memory round trip of the
+    chosen section (see verify_chart).
+    """
+    import numpy as np
+    import textCompression as tc
+    from profiling import stage
+
+    image, template, lut = _load_chart(image_path, template_name, profiler)
+    dft, max_coeff, labels = encode_frame(image, template, lut, profiler, lean, n=max_n, keep_labels=True)
+
+    mask = _chart_mask(template, labels.shape)
+    chart_labels = labels[mask]
+
+    x, y = dft.shape
+    rows, cols = tc.dft_index(x, max_n)
+    coeffs = dft[rows, cols].astype(np.float64)
+    del dft
+
+    # Lines write_message puts around the section, one newline each
+    envelope = [line for lines in message_envelope() for line in lines]
+    envelope_chars = sum(len(line) + 1 for line in envelope)
+
+    curve = []
+    sections = {}
+    quantized = {}
+    with stage(profiler, 'rate'):
+        for n in range(1, max_n + 1):
+            k = 4 * n * n
+
+            # Normalize as encode_image does
+            c = coeffs[:k]
+            max_dft = np.max(np.abs(c))
+            if max_dft > 0:
+                c = np.clip(c * (1000.0 / max_dft), -1000.0, 1000.0)
+            q = tc.coeff_round_array(c)
+
+            header = f"{x}/{y}/{n}/{max_coeff}/{dtg}/{template_name}/A1R1G2U3S5/"
+            section = [header] + tc.msgdata_pack(q.tolist()).splitlines()
+            sections[n] = section
+            quantized[n] = q
+
+            # Decode as the receiver will
+            trial = np.zeros((x, y), dtype=np.float32 if lean else np.float64)
+            trial[rows[:k], cols[:k]] = tc.coeff_unround_array(q)
+            accuracy = float(np.mean(labels_from_dft(trial, max_coeff, lean)[mask] == chart_labels))
+
+            curve.append({
+                'n': n,
+                'chars': envelope_chars + sum(len(line) + 1 for line in section),
+                'lines': len(envelope) + len(section),
+                'accuracy': round(accuracy, 6)
+            })
+
+    fits = [c for c in curve
+            if (max_chars is None or c['chars'] <= max_chars) and (max_lines is None or c['lines'] <= max_lines)]
+    if not fits:
+        raise ValueError(f"No n up to {max_n} fits the size limit; the message takes "
+                         f"{curve[0]['chars']} characters in {curve[0]['lines']} lines at n=1")
+
+    met = [c for c in fits if min_accuracy is not None and c['accuracy'] >= min_accuracy]
+    choice = met[0] if met else max(fits, key=lambda c: c['accuracy'])
+
+    rate = {
+        'n': choice['n'],
+        'chars': choice['chars'],
+        'lines': choice['lines'],
+        'target_met': bool(met) if min_accuracy is not None else None,
+        'curve': curve
+    }
+
+    if verify is not None:
+        recon = tc.coeff_unround_array(quantized[choice['n']])
+        with stage(profiler, 'verify'):
+            verify.update(verify_chart(recon, (x, y), choice['n'], max_coeff, image, labels, template, dtg, lean))
+
+    return sections[choice['n']], max_coeff, rate
+
+
+def encode_loop(image_path, template_name, dtg, profiler=None, lean=False):
+    """
+    Compress every frame of an animated GIF (a forecast loop sharing one layout)
+    into one message section. The header gains an L<frames>/ field; the first
+    frame is coded exactly as encode_image would, later frames as closed-loop
+    differences to the frame before (see textCompression.loopdata_write).
+    Returns (section, max_coeffs).
+    """
+    import imageio.v2 as imageio
+    import numpy as np
+    import textCompression as tc
+    import templateCache
+    import plot
+    from profiling import stage
+
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Image file not found: {image_path}")
+
+    with stage(profiler, 'load'):
+        frames = [np.asarray(frame) for frame in imageio.mimread(image_path)]
+    if not frames:
+        raise ValueError(f"No frames in {image_path}")
+
+    with stage(profiler, 'template'):
+        template = load_template(template_name)
+        lut = templateCache.lut(template)
+
+    # Every frame is cut to the first frame's chart area so the DFTs line up
+    bounds = plot.lrtb(frames[0])
+
+    coeffs = []
+    max_coeffs = []
+    for frame in frames:
+        dft, max_coeff = encode_frame(frame, template, lut, profiler, lean, bounds)
+        rows, cols = tc.dft_index(dft.shape[0], 12)
+        coeffs.append(dft[rows, cols].astype(np.float64))
+        max_coeffs.append(max_coeff)
 
-        msg_template_path = None
+    with stage(profiler, 'normalize'):
+        # Normalize every frame by the first frame's largest coefficient (see encode_image)
+        max_dft = np.max(np.abs(coeffs[0]))
+        if max_dft > 0:
+            coeffs = [c * (1000.0 / max_dft) for c in coeffs]
+            coeffs[0] = np.clip(coeffs[0], -1000.0, 1000.0)
+
+    with stage(profiler, 'msgdata_write'):
+        msg_data = tc.loopdata_write(coeffs, max_coeffs)
+
+    header = (f"{dft.shape[0]}/{dft.shape[1]}/12/{max_coeffs[0]}/{dtg}/{template_name}"
+              f"/A1R1G2U3S5/L{len(frames)}/")
+
+    return [header] + msg_data.splitlines(), max_coeffs
+
+
+def message_envelope():
+    """
+    Intro and outro lines wrapped around every message, from Message Template.txt
+    """
+    import textCompression as tc
+
+    # Get message template path
+    # First try bundled templates (for packaged app), then user templates
+    bundled_templates = os.environ.get('ARGUS_BUNDLED_TEMPLATES')
+    user_templates = os.environ.get('ARGUS_USER_TEMPLATES', './templates')
+
+    msg_template_path = None
+
+    # Try bundled templates first
+    if bundled_templates:
+        bundled_path = os.path.join(bundled_templates, 'Message Template.txt')
+        if os.path.exists(bundled_path):
+            msg_template_path = bundled_path
+
+    # Fall back to user templates
+    if not msg_template_path:
+        user_path = os.path.join(user_templates, 'Message Template.txt')
+        if os.path.exists(user_path):
+            msg_template_path = user_path
+
+    # Last resort: relative path (development mode)
+    if not msg_template_path:
+        msg_template_path = os.path.join('./templates', 'Message Template.txt')
+
+    # Create a simple object with msg_template attribute for msgcontent_write
+    class MsgTemplate:
+        def __init__(self, path):
+            self.msg_template = path
 
-        # Try bundled templates first
-        if bundled_templates:
-            bundled_path = os.path.join(bundled_templates, 'Message Template.txt')
-            if os.path.exists(bundled_path):
-                msg_template_path = bundled_path
+    fp = MsgTemplate(msg_template_path)
+    msg_intro, msg_outro = tc.msgcontent_write(fp)
 
-        # Fall back to user templates
-        if not msg_template_path:
-            user_path = os.path.join(user_templates, 'Message Template.txt')
-            if os.path.exists(user_path):
-                msg_template_path = user_path
+    return msg_intro.splitlines(), msg_outro.splitlines()
 
-        # Last resort: relative path (development mode)
-        if not msg_template_path:
-            msg_template_path = os.path.join('./templates', 'Message Template.txt')
 
-        # Create a simple object with msg_template attribute for msgcontent_write
-        class MsgTemplate:
-            def __init__(self, path):
-                self.msg_template = path
+def write_message(output_path, sections):
+    """
+    Write chart sections (see encode_image) inside one message envelope.
+    Returns the size of the written file in bytes.
+    """
+    msg_intro, msg_outro = message_envelope()
 
-        fp = MsgTemplate(msg_template_path)
-        msg_intro, msg_outro = tc.msgcontent_write(fp)
+    with open(output_path, 'w') as file:
+        for line in msg_intro:
+            print(line, file=file)
         
-        with open(output_path, 'w') as file:
-            for line in msg_intro.splitlines():
-                print(line, file=file)
-            
-            # Header with metadata
-            print(
-                f"{dft.shape[0]}/{dft.shape[1]}/12/{max_coeff}/{dtg}/{template_name}/A1R1G2U3S5/",
-                file=file
-            )
-            
-            for line in msg_data.splitlines():
-                print(line, file=file)
-            
-            for line in msg_outro.splitlines():
+        for section in sections:
+            for line in section:
                 print(line, file=file)
         
+        for line in msg_outro:
+            print(line, file=file)
+
+    return os.path.getsize(output_path)
+
+
+def compress_image(image_path, template_name, dtg, output_path, profile=False, profile_dump=False, lean=False,
+                   loop=False, delta=False, max_chars=None, max_lines=None, min_accuracy=None, max_n=RATE_MAX_N,
+                   verify=False, preview_path=None):
+    """
+    Compress image to VLF message format - following original exactly
+    profile adds a 'timings' object (wall time, tracemalloc and RSS peaks per stage);
+    profile_dump also writes a cProfile dump to <output_path>.prof
+    lean runs the reduced-memory pipeline (see encode_image)
+    loop codes every frame of an animated GIF in one message (see encode_loop)
+    delta sends the difference to the last chart sent for the template, when
+    there is one and it is shorter ('delta_base' in the result)
+    max_chars, max_lines and min_accuracy choose the number of coefficients for
+    a size budget or fidelity target (see encode_rate); 'rate' in the result
+    reports the size/accuracy curve
+    verify decodes the message in memory, as the receiver will, and adds a
+    'verify' object (pixels, accuracy, mae, psnr; see verify_chart); with
+    preview_path the restored image is also written there
+    Every single chart sent is kept in the 'sent' delta store.
+    """
+    import deltaStore
+    import textCompression as tc
+    from profiling import profile_run, stage
+
+    try:
+        dump_path = f"{output_path}.prof" if profile_dump else None
+        if loop and (verify or preview_path):
+            raise ValueError('Verification applies to single charts, not loops')
+
+        rate = None
+        verification = {} if verify or preview_path else None
+        with profile_run(profile or profile_dump, dump_path) as profiler:
+            if loop:
+                section, max_coeffs = encode_loop(image_path, template_name, dtg, profiler, lean)
+                max_coeff = max_coeffs[0]
+            elif max_chars is not None or max_lines is not None or min_accuracy is not None:
+                section, max_coeff, rate = encode_rate(image_path, template_name, dtg, max_chars, max_lines,
+                                                       min_accuracy, max_n, profiler, lean, verification)
+            else:
+                base = deltaStore.latest('sent', template_name, exclude=dtg) if delta else None
+                section, max_coeff = encode_image(image_path, template_name, dtg, profiler, lean, base,
+                                                  verification)
+            with stage(profiler, 'write'):
+                size_bytes = write_message(output_path, [section])
+                if preview_path:
+                    import imageio.v2 as imageio
+                    imageio.mimsave(preview_path, [verification['restored']])
+            if not loop:
+                # remember the chart as the receiver will rebuild it
+                coeffs = parse_chart(section[0], section[1:], 'sent', lean)[4]
+                remember_chart('sent', section[0], coeffs)
+        
         # Return success
-        size_bytes = os.path.getsize(output_path)
-        return {
+        result = {
             'status': 'success',
             'message_path': output_path,
             'size_bytes': size_bytes,
@@ -293,6 +644,22 @@ def compress_image(image_path, template_name, dtg, output_path):
             'dtg': dtg,
             'max_coeff': max_coeff
         }
+        if loop:
+            result['frames'] = len(max_coeffs)
+        if delta:
+            result['delta_base'] = tc.msg_delta_base(section[0])
+        if rate is not None:
+            result['rate'] = rate
+        if verification is not None:
+            del verification['restored']
+            if preview_path:
+                verification['preview_path'] = preview_path
+            result['verify'] = verification
+        if profiler is not None:
+            result['timings'] = profiler.timings()
+        if dump_path:
+            result['profile_path'] = dump_path
+        return result
         
     except Exception as e:
         return {
@@ -301,233 +668,1181 @@ def compress_image(image_path, template_name, dtg, output_path):
         }
 
 
-def decompress_message(message_path, output_path, template_override=None):
+def _compress_job(job):
     """
-    Decompress VLF message to image - following original test.py exactly
+    Run one compress-batch job. Never raises, so one bad chart cannot abort the batch.
     """
     try:
-        if not os.path.exists(message_path):
-            raise FileNotFoundError(f"Message file not found: {message_path}")
-        
-        # Read and parse message
-        with open(message_path, 'r') as file:
-            msg = file.read()
-        
-        # Parse message using original function
-        dft, max_coeff, template_from_msg, dtg = tc.msg_read(msg)
-        
-        # Select template
-        template = template_override if template_override else template_from_msg
-
-        # Find template in user or bundled templates
-        template_gif, template_config = find_template_paths(template)
+        template_name = job['template']
+        dtg = job['dtg']
+        output_path = job.get('output_path') or os.path.join(
+            os.environ.get('ARGUS_OUTPUT_DIR', '.'), f"{template_name}_{dtg}.txt"
+        )
+        return compress_image(job['image_path'], template_name, dtg, output_path)
 
-        # Load template config
-        with open(template_config, 'r') as f:
-            c = yaml.safe_load(f)
-        
-        c['scale'] = np.array(c['scale']).astype(np.uint8)
-        
-        # Apply inverse DFT exactly as in original test.py
-        plt_out = cv.idft(dft)
-        
-        # Clip negative values
-        plt_out[plt_out < 0] = 0
-        
-        # Scale by max_coeff
-        if np.max(plt_out) > 0:
-            plt_out = plt_out * (max_coeff / np.max(plt_out))
-        
-        # Remove padding (50 pixels as in compression)
-        plt_out = plt_out[50:-50, 50:-50]
-        
-        # Round to integers
-        plt_out = np.round(plt_out).astype(int)
-        
-        # CRITICAL FIX: Add 1 to plt_out values
-        # plot.gen produces 1,2,3... but we need to shift back after processing
-        plt_out = plt_out + 1  # Now matches what plot.gen produces
-        
-        # Use the proper restore function
-        restored_image = restore_properly(plt_out, template_gif, c['scale'], dtg)
-        
-        # Ensure valid image format
-        restored_image = np.clip(restored_image, 0, 255).astype(np.uint8)
-        
-        # Save image
-        imageio.mimsave(output_path, [restored_image])
-        
-        return {
-            'status': 'success',
-            'image_path': output_path,
-            'template': template,
-            'dtg': dtg
-        }
-        
     except Exception as e:
         return {
             'status': 'error',
-            'error': str(e)
+            'error': f"Job is missing required field {e}" if isinstance(e, KeyError) else str(e)
         }
 
 
-def restore_properly(plt, template_gif_path, scale, dtg):
-    """
-    Properly restore image matching the original plot.restore logic
+def _read_jobs(jobs_path):
+    """Load a JSON list of chart jobs; entries that are not objects become empty jobs"""
+    if not os.path.exists(jobs_path):
+        raise FileNotFoundError(f"Jobs file not found: {jobs_path}")
 
-    CRITICAL: plot.gen produces values 1,2,3... for scale indices 0,1,2...
-    So plt value 1 should use scale[0], plt value 2 should use scale[1], etc.
-    """
-    # Load template
-    template_data = imageio.mimread(template_gif_path)
-    if isinstance(template_data, list) and len(template_data) > 0:
-        out = template_data[0]
-    else:
-        out = imageio.imread(template_gif_path)
-    
-    out = np.array(out).copy()  # Make writable copy
-    x, y = out.shape[:2]
-    
-    # Get bounds using original function
-    l, r, t, b = plot.lrtb(out)
-    
-    # Template mask parameters (red areas)
-    mt = [125, 0, 0]  # Red marker color
-    var = 25  # Variance threshold
-    x_p, y_p = plt.shape
-    
-    # Create mask for template areas (red regions)
-    mask = np.ones_like(out[:,:,0]).astype(int)
-    for i in range(3):
-        mask = np.multiply(
-            mask,
-            np.array(abs(out[:,:,i].astype(int) - mt[i]) < var).astype(int)
-        )
-    
-    # Create colored plot
-    plt_color = np.zeros((x_p, y_p, 3)).astype(np.uint8)
-    
-    # CRITICAL FIX: Map plt values correctly to scale indices
-    # plt value 0 -> background (no color)
-    # plt value 1 -> scale[0]
-    # plt value 2 -> scale[1]
-    # plt value 3 -> scale[2]
-    # etc.
-    
-    # Skip value 0 (background), start from value 1
-    for j in range(1, len(scale) + 1):
-        if j <= len(scale):  # Safety check
-            scale_idx = j - 1  # plt value j uses scale[j-1]
-            for i in range(3):
-                # Apply color where plt equals this value
-                color_mask = (plt == j).astype(np.uint8)
-                plt_color[:,:,i] += color_mask * scale[scale_idx, i]
-    
-    # Resize colored plot to fit template bounds
-    plt_color = cv.resize(plt_color, (r-l, b-t))
-    
-    # Apply colored plot to template
-    for i in range(3):
-        # Keep original where mask is 0, replace with colors where mask is 1
-        out[t:b,l:r,i] = (
-            np.multiply(mask[t:b,l:r] == 0, out[t:b,l:r,i]) +
-            np.multiply(mask[t:b,l:r], plt_color[:,:,i])
-        )
-    
-    # Add DTG text if space available
-    if t < x - b:
-        x_text = b + (x - b)//2
-    else:
-        x_text = t//2
-    
-    # Add text with border for visibility - SMALLER SIZE
-    font = cv.FONT_HERSHEY_SIMPLEX
-    cv.putText(out, dtg, (l, x_text), font, 0.6, (255,255,255), 2, cv.LINE_AA)  # Reduced from 1.25 to 0.6
-    cv.putText(out, dtg, (l, x_text), font, 0.6, (0,0,0), 1, cv.LINE_AA)  # Reduced border thickness
-    
-    return out
+    with open(jobs_path, 'r') as f:
+        jobs = json.load(f)
+
+    if not isinstance(jobs, list):
+        raise ValueError('Jobs file must contain a JSON list of jobs')
 
+    return [job if isinstance(job, dict) else {} for job in jobs]
 
-def list_templates():
+
+def iter_pool(fn, items, workers=None, modules=()):
     """
-    List available templates from multiple locations.
-    Searches:
-    1. User templates directory (next to exe) - from ARGUS_USER_TEMPLATES env var
-    2. Bundled templates directory (in app bundle) - from ARGUS_BUNDLED_TEMPLATES env var
-    3. Fallback: ./templates (for development/backward compatibility)
+    Apply fn to every item using a process pool, yielding (index, result) as each one finishes.
+    Each worker imports `modules` once at start-up and keeps its template cache
+    for every item it handles. Runs inline when only one worker is needed.
     """
-    templates = []
-    templates_found = {}  # Track templates by name to avoid duplicates
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(items)))
 
-    # Get template directories from environment or use defaults
-    template_dirs = []
+    if workers == 1:
+        for k, item in enumerate(items):
+            yield k, fn(item)
+        return
 
-    # Priority 1: User templates (next to exe)
-    user_templates = os.environ.get('ARGUS_USER_TEMPLATES', './templates')
-    if user_templates:
-        template_dirs.append((user_templates, 'user'))
+    from concurrent.futures import ProcessPoolExecutor, as_completed
 
-    # Priority 2: Bundled templates (in app bundle)
-    bundled_templates = os.environ.get('ARGUS_BUNDLED_TEMPLATES')
-    if bundled_templates and bundled_templates != user_templates:
-        template_dirs.append((bundled_templates, 'bundled'))
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_modules, initargs=(list(modules),)) as pool:
+        futures = {pool.submit(fn, item): k for k, item in enumerate(items)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
 
-    # Ensure user templates directory exists
-    if user_templates and not os.path.exists(user_templates):
-        try:
-            os.makedirs(user_templates, exist_ok=True)
-        except:
-            pass
 
-    # Search all template directories
-    for templates_dir, source in template_dirs:
-        if not os.path.exists(templates_dir):
-            continue
+def run_pool(fn, items, workers=None, modules=()):
+    """
+    Apply fn to every item using a process pool and return the results in order.
+    See iter_pool().
+    """
+    items = list(items)
+    results = [None] * len(items)
+    for k, result in iter_pool(fn, items, workers, modules):
+        results[k] = result
+    return results
 
-        try:
-            for item in os.listdir(templates_dir):
-                # Skip if we already found this template (user templates take priority)
-                if item in templates_found:
-                    continue
 
-                template_path = os.path.join(templates_dir, item)
-
-                if os.path.isdir(template_path):
-                    config_file = os.path.join(template_path, f"{item}.yaml")
-                    template_file = os.path.join(template_path, f"{item}_template.gif")
-
-                    if os.path.exists(config_file) and os.path.exists(template_file):
-                        try:
-                            with open(config_file, 'r') as f:
-                                config = yaml.safe_load(f)
-
-                            template_info = {
-                                'name': item,
-                                'config_path': config_file,
-                                'template_path': template_file,
-                                'scale_colors': len(config.get('scale', [])),
-                                'source': source  # Track where template came from
-                            }
-                            templates.append(template_info)
-                            templates_found[item] = True
-                        except:
-                            continue
-        except Exception as e:
-            # Continue searching other directories even if one fails
-            continue
+def compress_batch(jobs_path, workers=None):
+    """
+    Compress many charts in one call.
+    jobs_path is a JSON file holding a list of jobs:
+        [{"image_path": ..., "template": ..., "dtg": ..., "output_path": ...}, ...]
+    output_path is optional and defaults to <ARGUS_OUTPUT_DIR>/<template>_<dtg>.txt.
+    Each worker loads a template at most once (see load_template), whichever jobs it takes.
+    """
+    try:
+        jobs = _read_jobs(jobs_path)
+        results = run_pool(_compress_job, jobs, workers, COMMAND_MODULES['compress'])
+        for k, result in enumerate(results):
+            result['job'] = k
 
-    return {
-        'status': 'success',
-        'templates': templates
-    }
+        failed = sum(1 for result in results if result['status'] != 'success')
+        return {
+            'status': 'success',
+            'results': results,
+            'succeeded': len(results) - failed,
+            'failed': failed
+        }
 
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
 
-def main():
-    """Main CLI entry point"""
-    # Ensure templates directory exists (especially important for portable exe)
-    # Use environment variable if available (set by main.js), otherwise use default
-    # Note: main.js creates these directories, so this is just a safety check
-    user_templates = os.environ.get('ARGUS_USER_TEMPLATES', './templates')
+
+# Line ahead of the chart sections of a bundle message: "<N>/ARGUS BUNDLE/"
+BUNDLE_MARKER = 'ARGUS BUNDLE'
+
+
+def _encode_job(job):
+    """Encode one compress-bundle chart. Never raises."""
+    try:
+        section, max_coeff = encode_image(job['image_path'], job['template'], job['dtg'])
+        return {
+            'status': 'success',
+            'template': job['template'],
+            'dtg': job['dtg'],
+            'max_coeff': max_coeff,
+            'section': section
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': f"Job is missing required field {e}" if isinstance(e, KeyError) else str(e)
+        }
+
+
+def compress_bundle(jobs_path, output_path, workers=None):
+    """
+    Compress several charts into one bundle message for a single broadcast slot.
+    jobs_path is a JSON file holding the charts in broadcast order:
+        [{"image_path": ..., "template": ..., "dtg": ...}, ...]
+    The bundle has one envelope from Message Template.txt, a "<N>/ARGUS BUNDLE/" line
+    and one section per chart with its own rows/cols/n/max_coeff/DTG/template header.
+    Nothing is written unless every chart compresses. Every chart written is
+    kept in the 'sent' delta store.
+    """
+    try:
+        jobs = _read_jobs(jobs_path)
+        if not jobs:
+            raise ValueError('Jobs file holds no charts')
+
+        results = run_pool(_encode_job, jobs, workers, COMMAND_MODULES['compress'])
+
+        sections = []
+        for k, result in enumerate(results):
+            result['job'] = k
+            sections.append(result.pop('section', None))
+
+        failed = sum(1 for result in results if result['status'] != 'success')
+        if failed:
+            return {
+                'status': 'error',
+                'error': f"{failed} of {len(jobs)} charts failed to compress",
+                'results': results
+            }
+
+        size_bytes = write_message(output_path, [[f"{len(sections)}/{BUNDLE_MARKER}/"]] + sections)
+
+        # remember every chart as the receiver will rebuild it, as compress_image does
+        for section in sections:
+            coeffs = parse_chart(section[0], section[1:], 'sent')[4]
+            remember_chart('sent', section[0], coeffs)
+
+        return {
+            'status': 'success',
+            'message_path': output_path,
+            'size_bytes': size_bytes,
+            'size_kb': round(size_bytes / 1024, 2),
+            'results': results
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+def labels_from_dft(dft, max_coeff, lean=False):
+    """
+    Decoded plot labels (1 + scale index, as plot.gen produces) from a message DFT.
+    lean works in place on a float32 DFT and returns uint8 labels (uint16 past
+    255); the label values are the same either way.
+    """
+    import cv2 as cv
+    import numpy as np
+
+    # Apply inverse DFT exactly as in original test.py
+    plt_out = cv.idft(dft)
+    
+    # Clip negative values
+    plt_out[plt_out < 0] = 0
+    
+    # Scale by max_coeff
+    peak = np.max(plt_out)
+    if peak > 0:
+        plt_out *= max_coeff / peak
+    
+    # Remove padding (50 pixels as in compression)
+    plt_out = plt_out[50:-50, 50:-50]
+    
+    # Round to integers
+    # CRITICAL FIX: Add 1 to plt_out values
+    # plot.gen produces 1,2,3... but we need to shift back after processing
+    if lean:
+        # values are 1..max_coeff+1 after the clip and rescale above
+        np.round(plt_out, out=plt_out)
+        plt_out += 1
+        return plt_out.astype(np.uint8 if max_coeff < 255 else np.uint16)
+
+    plt_out = np.round(plt_out).astype(int)
+    return plt_out + 1  # Now matches what plot.gen produces
+
+
+def parse_chart(header, body, role='received', lean=False):
+    """
+    Parse a single-chart message section (header line, body lines). Delta
+    messages are rebuilt from the base chart in the role's delta store.
+    Returns (dft, max_coeff, template, dtg, coeffs), where coeffs are the
+    reconstructed coefficients to pass to remember_chart once the chart has
+    decoded; raises deltaStore.MissingBase when a delta message's base chart
+    is not stored.
+    """
+    import numpy as np
+    import textCompression as tc
+    import deltaStore
+
+    dtype = np.float32 if lean else np.float64
+    x, y, n, max_coeff, dtg, template = tc.msg_header(header)
+    base_dtg = tc.msg_delta_base(header)
+
+    if base_dtg is None:
+        dft = tc.msg_decode(header, body, dtype)[0]
+        rows, cols = tc.dft_index(x, n)
+        coeffs = dft[rows, cols]
+    else:
+        base = deltaStore.load(role, template, base_dtg)
+        if base is None or base['shape'] != (x, y):
+            raise deltaStore.MissingBase(template, base_dtg)
+        dft, _, _, _, coeffs = tc.msg_decode_delta(header, body, base['coeffs'], dtype)
+
+    return dft, max_coeff, template, dtg, coeffs
+
+
+def remember_chart(role, header, coeffs):
+    """
+    Store a chart (see parse_chart) in the role's delta store as a base for
+    later deltas. Charts whose template is not installed here are not stored.
+    """
+    import textCompression as tc
+    import deltaStore
+
+    x, y, n, max_coeff, dtg, template = tc.msg_header(header)
+    try:
+        load_template(template)
+    except Exception:
+        return
+
+    deltaStore.save(role, template, dtg, coeffs, (x, y))
+
+
+def decode_image(dft, max_coeff, template, dtg, profiler=None, lean=False):
+    """
+    Turn a parsed message (see textCompression.msg_read) into the restored chart image.
+    Shared by every decompress command.
+    profiler is an optional profiling.StageProfiler timing each stage.
+    lean decodes a float32 DFT to uint8 labels (see labels_from_dft).
+    """
+    import numpy as np
+    from profiling import stage
+
+    with stage(profiler, 'template'):
+        # Find template in user or bundled templates
+        compiled = load_template(template)
+    
+    with stage(profiler, 'idft'):
+        plt_out = labels_from_dft(dft, max_coeff, lean)
+    
+    with stage(profiler, 'restore'):
+        # Use the proper restore function
+        restored_image = restore_properly(plt_out, compiled, dtg)
+        
+        # Ensure valid image format
+        if restored_image.dtype != np.uint8:
+            restored_image = np.clip(restored_image, 0, 255).astype(np.uint8)
+        return restored_image
+
+
+# Frame time of decoded loops, in milliseconds
+LOOP_FRAME_MS = 500
+
+
+def _decode_frame_job(job):
+    """Decode one frame of a loop message"""
+    dft, max_coeff, template, dtg, lean = job
+    return decode_image(dft, max_coeff, template, dtg, lean=lean)
+
+
+def decode_loop(header, body, template_override=None, lean=False, workers=None):
+    """
+    Decode every frame of a loop message (see encode_loop), restoring the frames in parallel.
+    Each frame is labelled "<DTG> <k>/<frames>". Returns (images, template, dtg).
+    """
+    import numpy as np
+    import textCompression as tc
+
+    frames, template_from_msg, dtg = tc.msg_decode_loop(header, body, np.float32 if lean else np.float64)
+    template = template_override if template_override else template_from_msg
+
+    jobs = [
+        (dft, max_coeff, template, f"{dtg} {k + 1}/{len(frames)}", lean)
+        for k, (dft, max_coeff) in enumerate(frames)
+    ]
+    return run_pool(_decode_frame_job, jobs, workers, COMMAND_MODULES['decompress']), template, dtg
+
+
+def decompress_message(message_path, output_path, template_override=None, profile=False, profile_dump=False, lean=False,
+                       workers=None):
+    """
+    Decompress VLF message to image - following original test.py exactly
+    profile adds a 'timings' object (wall time, tracemalloc and RSS peaks per stage);
+    profile_dump also writes a cProfile dump to <output_path>.prof
+    lean decodes in float32 with uint8 labels (see labels_from_dft)
+    Loop messages decode to an animated GIF, using up to workers processes.
+    Delta messages are rebuilt from the stored base chart (see parse_chart); when
+    it is missing the result is an error naming it in 'missing_base'.
+    """
+    import imageio.v2 as imageio
+    import textCompression as tc
+    import deltaStore
+    from profiling import profile_run, stage
+
+    try:
+        if not os.path.exists(message_path):
+            raise FileNotFoundError(f"Message file not found: {message_path}")
+        
+        dump_path = f"{output_path}.prof" if profile_dump else None
+        with profile_run(profile or profile_dump, dump_path) as profiler:
+            with stage(profiler, 'msg_read'):
+                # Read and parse message
+                with open(message_path, 'r') as file:
+                    msg = file.read()
+                
+                # Loop messages carry L<frames>/ after the header marker
+                header, body = tc.msg_split(msg)
+                frames = tc.msg_loop_frames(header)
+                if frames == 1:
+                    dft, max_coeff, template_from_msg, dtg, coeffs = parse_chart(header, body, lean=lean)
+                elif not tc.msg_split_frames(body)[frames - 1:]:
+                    raise ValueError('Loop message is incomplete')
+            
+            if frames == 1:
+                # Select template
+                template = template_override if template_override else template_from_msg
+
+                restored_image = decode_image(dft, max_coeff, template, dtg, profiler, lean)
+                
+                with stage(profiler, 'write'):
+                    # Save image
+                    imageio.mimsave(output_path, [restored_image])
+
+                remember_chart('received', header, coeffs)
+            else:
+                with stage(profiler, 'frames'):
+                    images, template, dtg = decode_loop(header, body, template_override, lean, workers)
+
+                with stage(profiler, 'write'):
+                    imageio.mimsave(output_path, images, duration=LOOP_FRAME_MS, loop=0)
+        
+        result = {
+            'status': 'success',
+            'image_path': output_path,
+            'template': template,
+            'dtg': dtg
+        }
+        if frames > 1:
+            result['frames'] = frames
+        if profiler is not None:
+            result['timings'] = profiler.timings()
+        if dump_path:
+            result['profile_path'] = dump_path
+        return result
+        
+    except deltaStore.MissingBase as e:
+        return {
+            'status': 'error',
+            'error': str(e),
+            'missing_base': {'template': e.template, 'dtg': e.dtg}
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+def _chart_output_path(out_dir, names, header, template_override=None):
+    """
+    out_dir/<template>_<dtg>.gif for a message header line. names counts the
+    names used so far, so repeated broadcasts of a chart get a _2, _3, ... suffix.
+    """
+    import textCompression as tc
+
+    dtg, template = tc.msg_header(header)[4:]
+    template = template_override if template_override else template
+
+    name = f"{template}_{dtg}".replace(' ', '').replace(os.sep, '_')
+    names[name] = names.get(name, 0) + 1
+    if names[name] > 1:
+        name = f"{name}_{names[name]}"
+    return os.path.join(out_dir, f"{name}.gif")
+
+
+def _decode_section(job):
+    """
+    Decode one message section (header line, body lines) to output_path. Never raises.
+    """
+    import imageio.v2 as imageio
+    import textCompression as tc
+
+    header, body, output_path, template_override = job
+    try:
+        if tc.msg_loop_frames(header) > 1:
+            # already inside a worker (or a stream): decode the frames in this process
+            images, template, dtg = decode_loop(header, body, template_override, workers=1)
+            imageio.mimsave(output_path, images, duration=LOOP_FRAME_MS, loop=0)
+        else:
+            dft, max_coeff, template_from_msg, dtg, coeffs = parse_chart(header, body)
+            template = template_override if template_override else template_from_msg
+
+            restored_image = decode_image(dft, max_coeff, template, dtg)
+            imageio.mimsave(output_path, [restored_image])
+            remember_chart('received', header, coeffs)
+
+        return {
+            'status': 'success',
+            'image_path': output_path,
+            'template': template,
+            'dtg': dtg
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+def decompress_stream(source, out_dir, template_override=None):
+    """
+    Decompress every message in a log of concatenated ARGUS messages.
+    source is a file path, or '-' for stdin. Lines are read lazily, so each message
+    is decoded as soon as its body is complete and memory stays bounded by one message.
+    Images are written to out_dir/<template>_<dtg>.gif; repeated broadcasts of the
+    same chart get a _2, _3, ... suffix.
+    """
+    import textCompression as tc
+
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+
+        if source == '-':
+            stream = sys.stdin
+        else:
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"Message log not found: {source}")
+            stream = open(source, 'r', errors='replace')
+
+        results = []
+        names = {}
+        try:
+            for k, (header, body) in enumerate(tc.iter_messages(stream)):
+                try:
+                    output_path = _chart_output_path(out_dir, names, header, template_override)
+                    result = _decode_section((header, body, output_path, template_override))
+                except Exception as e:
+                    result = {
+                        'status': 'error',
+                        'error': str(e)
+                    }
+
+                result['message'] = k
+                results.append(result)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        failed = sum(1 for result in results if result['status'] != 'success')
+        return {
+            'status': 'success',
+            'results': results,
+            'decoded': len(results) - failed,
+            'failed': failed
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+def decompress_bundle(bundle_path, out_dir, template_override=None, workers=None):
+    """
+    Decompress every chart section of a bundle message (see compress_bundle)
+    into out_dir/<template>_<dtg>.gif, decoding the sections in parallel.
+    'missing' counts sections announced by the bundle line but not found.
+    """
+    import textCompression as tc
+
+    try:
+        if not os.path.exists(bundle_path):
+            raise FileNotFoundError(f"Bundle file not found: {bundle_path}")
+
+        os.makedirs(out_dir, exist_ok=True)
+
+        with open(bundle_path, 'r') as file:
+            lines = file.read().splitlines()
+
+        sections = list(tc.iter_messages(lines))
+        if not sections:
+            raise ValueError('No ARGUS message header (A1R1G2U3S5) found')
+
+        expected = len(sections)
+        for line in lines:
+            if BUNDLE_MARKER in line:
+                expected = int(line.split('/')[0])
+                break
+
+        names = {}
+        jobs = [
+            (header, body, _chart_output_path(out_dir, names, header, template_override), template_override)
+            for header, body in sections
+        ]
+        results = run_pool(_decode_section, jobs, workers, COMMAND_MODULES['decompress'])
+
+        for k, result in enumerate(results):
+            result['section'] = k
+
+        failed = sum(1 for result in results if result['status'] != 'success')
+        return {
+            'status': 'success',
+            'results': results,
+            'decoded': len(results) - failed,
+            'failed': failed,
+            'missing': max(0, expected - len(sections))
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+def _decompress_job(job):
+    """Run one decompress-dir job"""
+    message_path, output_path, template = job
+    return decompress_message(message_path, output_path, template, workers=1)
+
+
+# Completed outputs of decompress-dir, kept in the output directory
+MANIFEST_NAME = '.argus_manifest.json'
+
+
+def decompress_dir(in_dir, out_dir, template_override=None, workers=None, force=False):
+    """
+    Decompress every message (*.txt) in in_dir into out_dir/<name>.gif using a worker pool.
+    A manifest of completed outputs is kept in out_dir so an interrupted run resumes
+    where it stopped. Messages whose output is newer than the message are skipped
+    unless force is set (e.g. to rebuild every chart after a template fix).
+    """
+    import fileUtils
+
+    try:
+        if not os.path.isdir(in_dir):
+            raise FileNotFoundError(f"Message directory not found: {in_dir}")
+
+        os.makedirs(out_dir, exist_ok=True)
+
+        manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        manifest = {}
+        if os.path.exists(manifest_path) and not force:
+            try:
+                with open(manifest_path, 'r') as f:
+                    manifest = json.load(f)
+            except ValueError:
+                manifest = {}
+
+        results = []
+        jobs = []
+        stamps = []
+        for name in sorted(os.listdir(in_dir)):
+            message_path = os.path.join(in_dir, name)
+            if not name.lower().endswith('.txt') or not os.path.isfile(message_path):
+                continue
+
+            output_name = os.path.splitext(name)[0] + '.gif'
+            output_path = os.path.join(out_dir, output_name)
+            stamp = fileUtils.file_stamp(message_path)
+
+            if not force and os.path.exists(output_path):
+                entry = manifest.get(name)
+                done = entry is not None and entry.get('input') == stamp and entry.get('output') == output_name
+                if done or os.stat(output_path).st_mtime_ns > stamp[0]:
+                    results.append({
+                        'status': 'skipped',
+                        'message_path': message_path,
+                        'image_path': output_path
+                    })
+                    continue
+
+            jobs.append((message_path, output_path, template_override))
+            stamps.append((name, output_name, stamp))
+
+        # Persist progress at most once a second so large archives don't rewrite the manifest per message
+        last_write = time.monotonic()
+        pending = False
+        for k, result in iter_pool(_decompress_job, jobs, workers, COMMAND_MODULES['decompress']):
+            result['message_path'] = jobs[k][0]
+            results.append(result)
+
+            if result['status'] == 'success':
+                name, output_name, stamp = stamps[k]
+                manifest[name] = {'output': output_name, 'input': stamp}
+                pending = True
+
+            if pending and time.monotonic() - last_write > 1.0:
+                fileUtils.write_atomic(manifest_path, lambda f: json.dump(manifest, f, indent=1), 'w')
+                last_write = time.monotonic()
+                pending = False
+
+        if pending:
+            fileUtils.write_atomic(manifest_path, lambda f: json.dump(manifest, f, indent=1), 'w')
+
+        counts = {'success': 0, 'skipped': 0, 'error': 0}
+        for result in results:
+            counts[result['status']] += 1
+
+        return {
+            'status': 'success',
+            'results': results,
+            'decoded': counts['success'],
+            'skipped': counts['skipped'],
+            'failed': counts['error']
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+def chart_metrics(source_path, decoded_path, template_name=None):
+    """
+    Fidelity of one decoded chart against its source image (see metrics.py),
+    over the chart pixels restore_properly paints.
+    decoded_path is either the message, decoded here in memory, or the decoded
+    image, whose labels are read back through the template's colour scale.
+    template_name defaults to the message's template; images need it.
+    Returns a dict with 'template', 'pixels', 'accuracy', 'mae', 'psnr' and
+    'confusion' (numpy array, rows source class, columns decoded class).
+    """
+    import cv2 as cv
+    import imageio.v2 as imageio
+    import numpy as np
+    import textCompression as tc
+    import plot
+
+    message = None
+    if not os.path.exists(decoded_path):
+        raise FileNotFoundError(f"Decoded file not found: {decoded_path}")
+    if decoded_path.lower().endswith('.txt'):
+        with open(decoded_path, 'r') as f:
+            header, body = tc.msg_split(f.read())
+        if tc.msg_loop_frames(header) > 1:
+            raise ValueError('Loop messages are not supported; compare the frames separately')
+        message = header, body
+        template_name = template_name or tc.msg_header(header)[5]
+    elif not template_name:
+        raise ValueError('A template name is needed to read labels from a decoded image')
+
+    source, template, lut = _load_chart(source_path, template_name)
+    source_labels = plot.gen(source, template['scale'], lut)
+
+    if message is not None:
+        # decoded as decompress does, without recording the chart
+        dft, max_coeff, _, dtg, _ = parse_chart(*message)
+        decoded_labels = labels_from_dft(dft, max_coeff)
+        restored = restore_properly(decoded_labels, template, dtg)
+    else:
+        restored = np.asarray(imageio.mimread(decoded_path)[0])[:, :, :3]
+        decoded_labels = plot.gen(restored, template['scale'], lut, template['bounds'])
+
+    if decoded_labels.shape != source_labels.shape:
+        decoded_labels = np.clip(decoded_labels, 0, 65535).astype(np.uint16)
+        decoded_labels = cv.resize(decoded_labels, source_labels.shape[::-1], interpolation=cv.INTER_NEAREST)
+
+    result = _fidelity(source, source_labels, decoded_labels, restored, template)
+    result['template'] = template_name
+    return result
+
+
+def _fidelity(source, source_labels, decoded_labels, restored, template):
+    """
+    metrics.label_metrics over the chart pixels restore_properly paints, plus
+    'psnr' of the restored image over the same pixels (None when the images differ in size)
+    """
+    import metrics
+
+    classes = len(template['scale']) + 2
+    result = metrics.label_metrics(source_labels, decoded_labels, classes,
+                                   _chart_mask(template, source_labels.shape))
+
+    result['psnr'] = None
+    if source.shape[:2] == restored.shape[:2]:
+        l, r, t, b = template['bounds']
+        result['psnr'] = metrics.psnr(source[t:b, l:r, :3], restored[t:b, l:r, :3], template['marker'][t:b, l:r])
+
+    return result
+
+
+def verify_chart(recon, shape, n, max_coeff, source, labels, template, dtg, lean=False):
+    """
+    Decode a chart's coefficients in memory, exactly as the receiver will read
+    them from the message, and measure the result against the source chart.
+    recon holds the quantized coefficients in message order (see
+    textCompression.dft_index); source, labels and template are the image,
+    plot.gen labels and template the encoder already has.
+    Returns {'pixels', 'accuracy', 'mae', 'psnr', 'restored'}, where restored
+    is the image decompress_message will produce.
+    """
+    import numpy as np
+    import textCompression as tc
+
+    rows, cols = tc.dft_index(shape[0], n)
+    dft = np.zeros(shape, dtype=np.float32 if lean else np.float64)
+    dft[rows, cols] = recon[:len(rows)]
+
+    decoded_labels = labels_from_dft(dft, max_coeff, lean)
+    restored = restore_properly(decoded_labels, template, dtg)
+    if restored.dtype != np.uint8:
+        restored = np.clip(restored, 0, 255).astype(np.uint8)
+
+    result = _fidelity(source, labels, decoded_labels, restored, template)
+    del result['confusion']
+    result['restored'] = restored
+    return result
+
+
+def _metrics_job(job):
+    """Run chart_metrics for one report pair. Never raises."""
+    try:
+        result = chart_metrics(job['source'], job['decoded'], job.get('template'))
+        result['status'] = 'success'
+        return result
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': f"Pair is missing required field {e}" if isinstance(e, KeyError) else str(e)
+        }
+
+
+METRICS_COLUMNS = ['source', 'decoded', 'template', 'status', 'pixels', 'accuracy', 'mae', 'psnr', 'error']
+
+
+def metrics_report(pairs_path, output_path, workers=None):
+    """
+    Fidelity report over many archived charts.
+    pairs_path is a JSON file holding a list of pairs:
+        [{"source": ..., "decoded": ..., "template": ...}, ...]
+    where decoded is a message or a decoded image (see chart_metrics) and
+    template is optional for messages.
+    Writes one CSV row per pair to output_path, and the confusion counts summed
+    per template (template, source_class, decoded_class, count) to
+    <output_path stem>_confusion.csv.
+    """
+    import csv
+    import numpy as np
+    import metrics
+
+    try:
+        pairs = _read_jobs(pairs_path)
+        results = run_pool(_metrics_job, pairs, workers, COMMAND_MODULES['decompress'])
+
+        confusion = {}
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(METRICS_COLUMNS)
+            for pair, result in zip(pairs, results):
+                if result['status'] == 'success':
+                    total = confusion.get(result['template'])
+                    confusion[result['template']] = (result['confusion'] if total is None
+                                                     else total + result['confusion'])
+                row = dict(pair, **result)
+                writer.writerow(['' if row.get(k) is None else row[k] for k in METRICS_COLUMNS])
+
+        confusion_path = f"{os.path.splitext(output_path)[0]}_confusion.csv"
+        with open(confusion_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['template', 'source_class', 'decoded_class', 'count'])
+            for template in sorted(confusion):
+                for row in metrics.confusion_rows(confusion[template]):
+                    writer.writerow([template, *row])
+
+        done = [result for result in results if result['status'] == 'success']
+        pixels = sum(result['pixels'] for result in done)
+        summary = {
+            'status': 'success',
+            'report_path': output_path,
+            'confusion_path': confusion_path,
+            'succeeded': len(done),
+            'failed': len(results) - len(done),
+            'accuracy': None,
+            'mae': None
+        }
+        if pixels:
+            summary['accuracy'] = sum(np.trace(m) for m in confusion.values()) / pixels
+            summary['mae'] = sum(result['mae'] * result['pixels'] for result in done if result['pixels']) / pixels
+        return summary
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+def restore_properly(plt, template, dtg):
+    """
+    Properly restore image matching the original plot.restore logic
+    template is a compiled template from load_template()
+
+    CRITICAL: plot.gen produces values 1,2,3... for scale indices 0,1,2...
+    So plt value 1 should use scale[0], plt value 2 should use scale[1], etc.
+    """
+    import cv2 as cv
+    import numpy as np
+
+    scale = template['scale'].astype(np.uint8)
+
+    # Load template
+    out = template['image'].copy()  # Make writable copy
+    x, y = out.shape[:2]
+    
+    # Get bounds using original function (precomputed per template)
+    l, r, t, b = template['bounds']
+    
+    # Mask for template areas (red marker regions, precomputed per template)
+    mask = template['marker']
+    
+    # CRITICAL FIX: Map plt values correctly to scale indices
+    # plt value 0 -> background (no color)
+    # plt value 1 -> scale[0]
+    # plt value 2 -> scale[1]
+    # etc.
+    # Values outside 1..len(scale) are clipped onto the black entries at either end
+    n = len(scale)
+    palette = np.zeros((n + 2, 3), dtype=np.uint8)
+    palette[1:n + 1] = scale
+    labels = np.clip(plt, 0, n + 1).astype(np.uint8 if n + 1 < 256 else np.uint16)
+    
+    # Resize labels to fit template bounds (only needed with a template override)
+    if labels.shape != (b - t, r - l):
+        labels = cv.resize(labels, (r - l, b - t), interpolation=cv.INTER_NEAREST)
+    
+    # Apply colored plot to template: replace with colors where mask is set
+    region = out[t:b, l:r, :3]
+    region[...] = np.where(mask[t:b, l:r, None], palette[labels], region)
+    
+    # Add DTG text if space available
+    if t < x - b:
+        x_text = b + (x - b)//2
+    else:
+        x_text = t//2
+    
+    # Add text with border for visibility - SMALLER SIZE
+    font = cv.FONT_HERSHEY_SIMPLEX
+    cv.putText(out, dtg, (l, x_text), font, 0.6, (255,255,255), 2, cv.LINE_AA)  # Reduced from 1.25 to 0.6
+    cv.putText(out, dtg, (l, x_text), font, 0.6, (0,0,0), 1, cv.LINE_AA)  # Reduced border thickness
+    
+    return out
+
+
+def list_templates(name_filter=None, offset=0, limit=None):
+    """
+    List available templates from multiple locations.
+    Searches:
+    1. User templates directory (next to exe) - from ARGUS_USER_TEMPLATES env var
+    2. Bundled templates directory (in app bundle) - from ARGUS_BUNDLED_TEMPLATES env var
+    3. Fallback: ./templates (for development/backward compatibility)
+    Templates are read from each root's cached index (see templateIndex.load).
+    name_filter keeps names containing the given text (case-insensitive);
+    offset/limit page through the sorted result and 'total' is the filtered count.
+    """
+    import templateIndex
+
+    templates = []
+    templates_found = {}  # Track templates by name to avoid duplicates
+
+    # Get template directories from environment or use defaults
+    template_dirs = []
+
+    # Priority 1: User templates (next to exe)
+    user_templates = os.environ.get('ARGUS_USER_TEMPLATES', './templates')
+    if user_templates:
+        template_dirs.append((user_templates, 'user'))
+
+    # Priority 2: Bundled templates (in app bundle)
+    bundled_templates = os.environ.get('ARGUS_BUNDLED_TEMPLATES')
+    if bundled_templates and bundled_templates != user_templates:
+        template_dirs.append((bundled_templates, 'bundled'))
+
+    # Ensure user templates directory exists
+    if user_templates and not os.path.exists(user_templates):
+        try:
+            os.makedirs(user_templates, exist_ok=True)
+        except:
+            pass
+
+    # Search all template directories
+    for templates_dir, source in template_dirs:
+        if not os.path.exists(templates_dir):
+            continue
+
+        try:
+            entries = templateIndex.load(templates_dir)
+        except Exception as e:
+            # Continue searching other directories even if one fails
+            continue
+
+        for item, entry in entries.items():
+            # Skip if we already found this template (user templates take priority)
+            if item in templates_found:
+                continue
+
+            template_path = os.path.join(templates_dir, item)
+            templates.append({
+                'name': item,
+                'config_path': os.path.join(template_path, f"{item}.yaml"),
+                'template_path': os.path.join(template_path, f"{item}_template.gif"),
+                'scale_colors': entry['scale_colors'],
+                'width': entry['width'],
+                'height': entry['height'],
+                'sha1': entry['sha1'],
+                'source': source  # Track where template came from
+            })
+            templates_found[item] = True
+
+    if name_filter:
+        name_filter = name_filter.lower()
+        templates = [t for t in templates if name_filter in t['name'].lower()]
+
+    templates.sort(key=lambda t: t['name'].lower())
+    total = len(templates)
+    end = None if limit is None else offset + limit
+
+    return {
+        'status': 'success',
+        'templates': templates[offset:end],
+        'total': total
+    }
+
+
+def _pop_option(args, name, cast=str, default=None):
+    """
+    Remove "--name value" from args (in place) and return the value, or default if absent.
+    """
+    if name not in args:
+        return default
+
+    k = args.index(name)
+    if k + 1 >= len(args):
+        raise ValueError(f'Missing value for {name}')
+
+    value = args[k + 1]
+    del args[k:k + 2]
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f'Invalid value for {name}: {value}')
+
+
+def _pop_flag(args, name):
+    """
+    Remove "--name" from args (in place) and return whether it was present.
+    """
+    if name not in args:
+        return False
+
+    args.remove(name)
+    return True
+
+
+def run_command(command, args):
+    """
+    Run a single CLI command and return its result dict.
+    Raises ValueError on bad usage.
+    """
+    if command == 'compress':
+        args = list(args)
+        profile = _pop_flag(args, '--profile')
+        profile_dump = _pop_flag(args, '--profile-dump')
+        lean = _pop_flag(args, '--lean')
+        loop = _pop_flag(args, '--loop')
+        delta = _pop_flag(args, '--delta')
+        max_chars = _pop_option(args, '--max-chars', int)
+        max_lines = _pop_option(args, '--max-lines', int)
+        min_accuracy = _pop_option(args, '--min-accuracy', float)
+        max_n = _pop_option(args, '--max-n', int, RATE_MAX_N)
+        verify = _pop_flag(args, '--verify')
+        preview_path = _pop_option(args, '--preview')
+        if len(args) != 4:
+            raise ValueError('Usage: compress <image_path> <template_name> <dtg> <output_path> [--loop | --delta | '
+                             '[--max-chars N] [--max-lines N] [--min-accuracy F] [--max-n N]] '
+                             '[--verify [--preview <gif_path>]] [--profile] [--profile-dump] [--lean]')
+        if preview_path and not verify:
+            raise ValueError('--preview needs --verify')
+        rate = max_chars is not None or max_lines is not None or min_accuracy is not None
+        if loop + delta + rate > 1:
+            raise ValueError('--loop, --delta and rate control (--max-chars, --max-lines, --min-accuracy) '
+                             'cannot be combined')
+        if max_n < 1:
+            raise ValueError('--max-n must be at least 1')
+
+        return compress_image(args[0], args[1], args[2], args[3], profile, profile_dump, lean, loop, delta,
+                              max_chars, max_lines, min_accuracy, max_n, verify, preview_path)
+
+    elif command == 'decompress':
+        args = list(args)
+        profile = _pop_flag(args, '--profile')
+        profile_dump = _pop_flag(args, '--profile-dump')
+        lean = _pop_flag(args, '--lean')
+        workers = _pop_option(args, '--workers', int)
+        if len(args) < 2:
+            raise ValueError('Usage: decompress <message_path> <output_path> [template_name] [--workers N] [--profile] [--profile-dump] [--lean]')
+
+        template = args[2] if len(args) > 2 else None
+        return decompress_message(args[0], args[1], template, profile, profile_dump, lean, workers)
+
+    elif command == 'decompress-dir':
+        args = list(args)
+        workers = _pop_option(args, '--workers', int)
+        template = _pop_option(args, '--template')
+        force = _pop_flag(args, '--force')
+        if len(args) != 2:
+            raise ValueError('Usage: decompress-dir <in_dir> <out_dir> [--template NAME] [--workers N] [--force]')
+
+        return decompress_dir(args[0], args[1], template, workers, force)
+
+    elif command == 'decompress-stream':
+        if len(args) not in (2, 3):
+            raise ValueError('Usage: decompress-stream <log_path|-> <out_dir> [template_name]')
+
+        template = args[2] if len(args) > 2 else None
+        return decompress_stream(args[0], args[1], template)
+
+    elif command == 'create-template':
+        if len(args) != 10:
+            raise ValueError('Usage: create-template <image_path> <template_name> <scale_start_x> <scale_start_y> <scale_end_x> <scale_end_y> <top> <bottom> <left> <right>')
+
+        scale_coords = {
+            'start_x': int(args[2]),
+            'start_y': int(args[3]),
+            'end_x': int(args[4]),
+            'end_y': int(args[5])
+        }
+
+        crop_coords = {
+            'top': int(args[6]),
+            'bottom': int(args[7]),
+            'left': int(args[8]),
+            'right': int(args[9])
+        }
+
+        return create_template(args[0], args[1], scale_coords, crop_coords)
+
+    elif command == 'compress-batch':
+        args = list(args)
+        workers = _pop_option(args, '--workers', int)
+        if len(args) != 1:
+            raise ValueError('Usage: compress-batch <jobs.json> [--workers N]')
+
+        return compress_batch(args[0], workers)
+
+    elif command == 'compress-bundle':
+        args = list(args)
+        workers = _pop_option(args, '--workers', int)
+        if len(args) != 2:
+            raise ValueError('Usage: compress-bundle <jobs.json> <output_path> [--workers N]')
+
+        return compress_bundle(args[0], args[1], workers)
+
+    elif command == 'decompress-bundle':
+        args = list(args)
+        workers = _pop_option(args, '--workers', int)
+        if len(args) not in (2, 3):
+            raise ValueError('Usage: decompress-bundle <bundle_path> <out_dir> [template_name] [--workers N]')
+
+        template = args[2] if len(args) > 2 else None
+        return decompress_bundle(args[0], args[1], template, workers)
+
+    elif command == 'metrics':
+        args = list(args)
+        workers = _pop_option(args, '--workers', int)
+        if len(args) != 2:
+            raise ValueError('Usage: metrics <pairs_json> <report_csv> [--workers N]')
+
+        return metrics_report(args[0], args[1], workers)
+
+    elif command == 'list-templates':
+        args = list(args)
+        name_filter = _pop_option(args, '--filter')
+        offset = _pop_option(args, '--offset', int, 0)
+        limit = _pop_option(args, '--limit', int)
+        if args:
+            raise ValueError('Usage: list-templates [--filter TEXT] [--offset N] [--limit N]')
+
+        return list_templates(name_filter, offset, limit)
+
+    else:
+        return {
+            'status': 'error',
+            'error': f'Unknown command: {command}'
+        }
+
+
+def serve():
+    """
+    Long-lived worker mode used by the Electron app.
+    Reads one JSON request per line on stdin, e.g.
+        {"id": 1, "command": "compress", "args": ["in.gif", "EUCOM", "071743ZNOV2025", "out.txt"]}
+    and writes one JSON result per line on stdout carrying the same id.
+    Modules, template configs and template images stay loaded between requests.
+    Only yaml is imported up front; the pipeline modules are imported after the
+    first reply (see SERVE_WARM_MODULES), or earlier by a request that needs them.
+    Exits when stdin is closed.
+    """
+    warm = False
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            command = request['command']
+            if command == 'serve':
+                raise ValueError('Already serving')
+            args = [str(a) for a in request.get('args', [])]
+            if command == 'decompress-stream' and args[:1] == ['-']:
+                raise ValueError('stdin carries requests in serve mode; pass a log path')
+
+            result = run_command(command, args)
+        except Exception as e:
+            result = {
+                'status': 'error',
+                'error': str(e)
+            }
+
+        result['id'] = request_id
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+        if not warm:
+            load_modules(SERVE_WARM_MODULES)
+            warm = True
+
+
+def main():
+    """Main CLI entry point"""
+    # Ensure templates directory exists (especially important for portable exe)
+    # Use environment variable if available (set by main.js), otherwise use default
+    # Note: main.js creates these directories, so this is just a safety check
+    user_templates = os.environ.get('ARGUS_USER_TEMPLATES', './templates')
     try:
         os.makedirs(user_templates, exist_ok=True)
     except PermissionError:
@@ -536,58 +1851,32 @@ def main():
         # Just continue - we'll fail later if the directory truly doesn't exist
         pass
 
-    if len(sys.argv) < 2:
+    argv = sys.argv[1:]
+    report = '--startup-report' in argv
+    if report:
+        argv.remove('--startup-report')
+
+    if len(argv) < 1:
         print(json.dumps({
             'status': 'error',
-            'error': 'No command provided. Commands: compress, decompress, create-template, list-templates'
+            'error': 'No command provided. Commands: compress, compress-batch, compress-bundle, decompress, decompress-dir, decompress-bundle, decompress-stream, create-template, list-templates, metrics, serve'
         }))
         sys.exit(1)
     
-    command = sys.argv[1]
+    command = argv[0]
+
+    try:
+        load_modules(COMMAND_MODULES.get(command, []))
+    finally:
+        if report:
+            startup_report()
+
+    if command == 'serve':
+        serve()
+        return
     
     try:
-        if command == 'compress':
-            if len(sys.argv) != 6:
-                raise ValueError('Usage: compress <image_path> <template_name> <dtg> <output_path>')
-            
-            result = compress_image(sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5])
-            
-        elif command == 'decompress':
-            if len(sys.argv) < 4:
-                raise ValueError('Usage: decompress <message_path> <output_path> [template_name]')
-            
-            template = sys.argv[4] if len(sys.argv) > 4 else None
-            result = decompress_message(sys.argv[2], sys.argv[3], template)
-            
-        elif command == 'create-template':
-            if len(sys.argv) != 12:
-                raise ValueError('Usage: create-template <image_path> <template_name> <scale_start_x> <scale_start_y> <scale_end_x> <scale_end_y> <top> <bottom> <left> <right>')
-            
-            scale_coords = {
-                'start_x': int(sys.argv[4]),
-                'start_y': int(sys.argv[5]),
-                'end_x': int(sys.argv[6]),
-                'end_y': int(sys.argv[7])
-            }
-            
-            crop_coords = {
-                'top': int(sys.argv[8]),
-                'bottom': int(sys.argv[9]),
-                'left': int(sys.argv[10]),
-                'right': int(sys.argv[11])
-            }
-            
-            result = create_template(sys.argv[2], sys.argv[3], scale_coords, crop_coords)
-            
-        elif command == 'list-templates':
-            result = list_templates()
-            
-        else:
-            result = {
-                'status': 'error',
-                'error': f'Unknown command: {command}'
-            }
-        
+        result = run_command(command, argv[1:])
         print(json.dumps(result))
         
     except Exception as e:
@@ -599,4 +1888,7 @@ def main():
 
 
 if __name__ == '__main__':
+    # Needed for process pools in the PyInstaller-frozen executable
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
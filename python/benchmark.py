@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Stage-level benchmark of the ARGUS pipeline.
+
+Runs compress and decompress on the bundled examples (examples/<T>_source.gif
+with the <T> template) and on nearest-neighbour upscaled copies of them, timing
+each stage separately: load, template, gen, condition, dft, msgdata_write,
+msg_read, idft and restore. Times are the best of --repeat warm runs; peak
+memory (bytes allocated above the start of the stage, via tracemalloc, and the
+process peak RSS during the stage) comes from one extra run, since tracing
+slows the Python-heavy stages.
+
+--lean benchmarks the reduced-memory pipeline instead and checks it against
+the standard one: whether the message text is identical and the fraction of
+decoded labels that match.
+
+Usage:
+    python python/benchmark.py [--scales 1,2] [--repeat 3] [--lean] [--output bench.json]
+                               [--baseline old.json] [--threshold 0.25]
+
+With --baseline, stages slower (or using more memory) than the baseline by more
+than --threshold are reported as regressions and the exit status is 1.
+"""
+
+import sys
+import os
+import json
+import platform
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import imageio.v2 as imageio
+import cv2 as cv
+
+import ARGUS_core
+import textCompression as tc
+from profiling import StageProfiler, stage
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES = ['EUCOM', 'LANT']
+DTG = '071743ZNOV2025'
+
+# Differences below these are treated as noise when comparing to a baseline
+MIN_SECONDS = 0.002
+MIN_BYTES = 1 << 20
+
+
+def example_image(name, scale, work_dir):
+    """Path of examples/<name>_source.gif, upscaled by an integer factor if scale > 1"""
+    path = os.path.join(REPO_DIR, 'examples', f'{name}_source.gif')
+    if scale == 1:
+        return path
+
+    image = np.array(imageio.mimread(path)[0])
+    image = np.repeat(np.repeat(image, scale, axis=0), scale, axis=1)
+    out = os.path.join(work_dir, f'{name}_x{scale}.gif')
+    imageio.mimsave(out, [image])
+    return out
+
+
+def run_pipeline(image_path, template, profiler, lean=False):
+    """Compress and decompress one chart in memory, timing every stage"""
+    section, max_coeff = ARGUS_core.encode_image(image_path, template, DTG, profiler, lean)
+
+    with stage(profiler, 'msg_read'):
+        dft, max_coeff, template, dtg = tc.msg_read('\n'.join(section), np.float32 if lean else np.float64)
+
+    ARGUS_core.decode_image(dft, max_coeff, template, dtg, profiler, lean)
+    return len(section)
+
+
+def bench_case(image_path, template, repeat, lean=False):
+    """{stage: {'seconds', 'peak_bytes', 'peak_rss_bytes'}} for one chart"""
+    run_pipeline(image_path, template, None, lean)  # warm caches (template, DFT tables)
+
+    seconds = {}
+    for _ in range(repeat):
+        profiler = StageProfiler()
+        run_pipeline(image_path, template, profiler, lean)
+        for name, s in profiler.report().items():
+            seconds[name] = min(seconds.get(name, s['seconds']), s['seconds'])
+
+    profiler = StageProfiler(memory=True)
+    run_pipeline(image_path, template, profiler, lean)
+
+    return {
+        name: {'seconds': seconds[name], 'peak_bytes': s['peak_bytes'], 'peak_rss_bytes': s['peak_rss_bytes']}
+        for name, s in profiler.report().items()
+    }
+
+
+def lean_accuracy(image_path, template):
+    """How the lean pipeline's message and decoded labels compare to the standard pipeline's"""
+    out = {}
+    for lean in (False, True):
+        section, max_coeff = ARGUS_core.encode_image(image_path, template, DTG, lean=lean)
+        dft, max_coeff = tc.msg_read('\n'.join(section), np.float32 if lean else np.float64)[:2]
+        out[lean] = section, ARGUS_core.labels_from_dft(dft, max_coeff, lean)
+
+    (section, labels), (lean_section, lean_labels) = out[False], out[True]
+    return {
+        'message_identical': section == lean_section,
+        'label_match': float(np.mean(labels == lean_labels))
+    }
+
+
+def run_benchmarks(scales=(1, 2), repeat=3, lean=False):
+    """Benchmark every example at every scale. Returns the results document."""
+    cases = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in EXAMPLES:
+            for scale in scales:
+                image_path = example_image(name, scale, work_dir)
+                shape = np.array(imageio.mimread(image_path)[0]).shape[:2]
+                cases[f'{name}@{scale}x'] = {
+                    'shape': list(shape),
+                    'stages': bench_case(image_path, name, repeat, lean)
+                }
+                if lean:
+                    cases[f'{name}@{scale}x']['accuracy'] = lean_accuracy(image_path, name)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'lean': lean
+        },
+        'cases': cases
+    }
+
+
+def compare(results, baseline, threshold=0.25):
+    """List of regressions of results against baseline (matching case and stage names)"""
+    regressions = []
+    for case, data in results['cases'].items():
+        base_case = baseline.get('cases', {}).get(case)
+        if base_case is None:
+            continue
+
+        for name, s in data['stages'].items():
+            b = base_case['stages'].get(name)
+            if b is None:
+                continue
+
+            for key, floor in (('seconds', MIN_SECONDS), ('peak_bytes', MIN_BYTES), ('peak_rss_bytes', MIN_BYTES)):
+                if s.get(key) is None or b.get(key) is None:
+                    continue
+                if s[key] > b[key] * (1 + threshold) and s[key] - b[key] > floor:
+                    regressions.append({
+                        'case': case,
+                        'stage': name,
+                        'metric': key,
+                        'baseline': b[key],
+                        'current': s[key],
+                        'ratio': round(s[key] / b[key], 2) if b[key] else None
+                    })
+
+    return regressions
+
+
+def print_table(results, stream=sys.stdout):
+    for case, data in results['cases'].items():
+        shape = 'x'.join(str(k) for k in data['shape'])
+        print(f'{case} ({shape})', file=stream)
+        for name, s in data['stages'].items():
+            rss = s.get('peak_rss_bytes')
+            rss = f"{rss / 2**20:10.1f} MiB RSS" if rss is not None else ''
+            print(f"  {name:<14}{s['seconds'] * 1000:10.2f} ms{s['peak_bytes'] / 2**20:10.2f} MiB{rss}", file=stream)
+        if 'accuracy' in data:
+            a = data['accuracy']
+            print(f"  lean: message identical {a['message_identical']}, "
+                  f"labels matching {a['label_match'] * 100:.3f}%", file=stream)
+
+
+def main(argv):
+    args = list(argv)
+    scales = [int(k) for k in ARGUS_core._pop_option(args, '--scales', str, '1,2').split(',')]
+    repeat = ARGUS_core._pop_option(args, '--repeat', int, 3)
+    output = ARGUS_core._pop_option(args, '--output')
+    baseline_path = ARGUS_core._pop_option(args, '--baseline')
+    threshold = ARGUS_core._pop_option(args, '--threshold', float, 0.25)
+    lean = ARGUS_core._pop_flag(args, '--lean')
+    if args:
+        print(__doc__, file=sys.stderr)
+        return 2
+
+    results = run_benchmarks(scales, repeat, lean)
+    print_table(results)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    if baseline_path:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['stage']} {r['metric']}: "
+                  f"{r['baseline']:.4g} -> {r['current']:.4g}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
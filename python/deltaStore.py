@@ -0,0 +1,142 @@
+import os
+import re
+import zipfile
+import numpy as np
+import fileUtils
+
+# The purpose of this file is to remember the DFT coefficients of recent
+# charts per template, so that a chart can be sent as a delta against an
+# earlier DTG. The encoder keeps what it sent ('sent') and the decoder what
+# it decoded ('received'). Both sides hold the coefficients as the decoder
+# reconstructs them, so they stay in step. Entries live in
+# <user templates>/.delta/<role>/<template>/<dtg>.npz and are written
+# atomically; failures to write are ignored (deltas then fall back to full
+# messages). Entries are ranked by DTG, not by when they were saved, so
+# decoding an archive of older charts never displaces newer bases.
+
+# Charts kept per role and template
+HISTORY = 8
+
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+# DDHHMMZMONYYYY, with optional spaces (written as '_' in entry names)
+DTG_PATTERN = re.compile(r'(\d{2})(\d{2})(\d{2})[\s_]*Z[\s_]*([A-Z]{3})[\s_]*(\d{2}|\d{4})$')
+
+
+class MissingBase(ValueError):
+    # A delta message whose base chart has not been decoded on this receiver
+    def __init__(self, template, dtg):
+        super().__init__(f"Delta message needs base chart {template} {dtg}, "
+                         f"which has not been decoded here; a full message is needed")
+        self.template = template
+        self.dtg = dtg
+
+
+def clean_name(name):
+    # input: string - DTG or template name, as read from a message header
+    # output: string - the name with everything but letters and digits as '_',
+    #                  safe to use as a single path component
+    return ''.join(c if c.isascii() and c.isalnum() else '_' for c in name)
+
+
+def dtg_key(name):
+    # input: string - DTG, or an entry name (clean_name of a DTG)
+    # output: tuple - sort key, later DTGs larger; DTGs that do not parse
+    #                 rank before every DTG that does, in name order
+    m = DTG_PATTERN.search(name.strip().upper())
+    if m is None or m.group(4) not in MONTHS:
+        return (0, name)
+
+    day, hour, minute, month, year = m.groups()
+    year = int(year) + (2000 if len(year) == 2 else 0)
+    return (1, year, MONTHS.index(month), int(day), int(hour), int(minute))
+
+
+def store_dir(role, template):
+    # input: string - 'sent' or 'received'
+    # input: string - template name
+    # output: string - directory holding the entries
+    root = os.environ.get('ARGUS_USER_TEMPLATES', './templates')
+    return os.path.join(root, '.delta', role, clean_name(template))
+
+
+def entry_path(role, template, dtg):
+    # input: strings - role, template name, DTG
+    # output: string - path of the entry for that DTG
+    return os.path.join(store_dir(role, template), f"{clean_name(dtg)}.npz")
+
+
+def save(role, template, dtg, coeffs, shape):
+    # input: strings     - role, template name, DTG
+    # input: float array - reconstructed coefficients in message order
+    # input: tuple (x,y) - DFT shape
+    # A chart older than every kept entry of a full history is not stored.
+    path = entry_path(role, template, dtg)
+    kept = entries(role, template)
+    if len(kept) >= HISTORY and path not in kept and dtg_key(clean_name(dtg)) < entry_key(kept[-1]):
+        return
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        fileUtils.write_atomic(path, lambda f: np.savez(f, coeffs = np.asarray(coeffs, dtype = np.float64),
+                                                        shape = np.array(shape, dtype = np.int64),
+                                                        dtg = np.array(dtg)))
+    except OSError:
+        return
+
+    prune(role, template)
+
+
+def load(role, template, dtg):
+    # input: strings - role, template name, DTG
+    # output: dict   - 'coeffs', 'shape', 'dtg', or None if not stored
+    return read_entry(entry_path(role, template, dtg))
+
+
+def read_entry(path):
+    try:
+        with np.load(path) as data:
+            return {
+                'coeffs': data['coeffs'],
+                'shape': tuple(int(k) for k in data['shape']),
+                'dtg': str(data['dtg'])
+            }
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def entry_key(path):
+    # input: string - entry path
+    # output: tuple - dtg_key of the entry's DTG
+    return dtg_key(os.path.basename(path)[:-len('.npz')])
+
+
+def entries(role, template):
+    # input: strings - role, template name
+    # output: list   - entry paths, latest DTG first
+    directory = store_dir(role, template)
+    try:
+        names = [k for k in os.listdir(directory) if k.endswith('.npz')]
+    except OSError:
+        return []
+
+    paths = [os.path.join(directory, name) for name in names]
+    return sorted(paths, key = lambda path: (entry_key(path), path), reverse = True)
+
+
+def latest(role, template, exclude = None):
+    # input: strings - role, template name, a DTG to skip (e.g. the one being sent)
+    # output: dict   - entry with the latest DTG (see load), or None
+    for path in entries(role, template):
+        entry = read_entry(path)
+        if entry is not None and entry['dtg'] != exclude:
+            return entry
+
+    return None
+
+
+def prune(role, template):
+    # Keep only the HISTORY entries with the latest DTGs
+    for path in entries(role, template)[HISTORY:]:
+        try: os.remove(path)
+        except OSError: pass
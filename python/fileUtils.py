@@ -0,0 +1,31 @@
+import os
+
+# The purpose of this file is to hold the two file helpers shared by the
+# caches ARGUS keeps on disk (compiled templates, the template index, the
+# delta store and the decompress-dir manifest): a stamp that tells whether
+# a file changed, and an atomic write so concurrent processes never read a
+# partial file. It imports nothing heavy, so list-templates stays quick.
+
+
+def file_stamp(path):
+    # input: string - file path
+    # output: list  - [mtime_ns, size]; raises OSError if the file is missing
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def write_atomic(path, write, mode = 'wb'):
+    # input: string   - destination path
+    # input: callable - writes the contents to the open file it is given
+    # input: string   - open mode, 'wb' or 'w'
+    # Writes to a temporary file first and renames it into place. Errors are
+    # raised after the temporary file is removed.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
@@ -0,0 +1,68 @@
+import numpy as np
+
+# The purpose of this file is to measure how faithfully a decoded chart
+# matches its source: label accuracy, mean absolute class error and the
+# confusion matrix between source and decoded label maps, and PSNR of the
+# restored RGB image. Everything is computed with whole-array numpy
+# operations, so a report over hundreds of archived charts stays cheap.
+
+
+def label_metrics(source, decoded, classes, mask = None):
+    # input: int array (x,y)  - source labels (plot.gen)
+    # input: int array (x,y)  - decoded labels, same shape
+    # input: int              - number of classes; labels are clipped to 0..classes-1
+    # input: bool array (x,y) - optional pixels to compare (e.g. the template marker)
+    # output: dict - 'pixels', 'accuracy' (share of exact matches), 'mae'
+    #                (mean absolute class error) and 'confusion' (classes x
+    #                classes counts, rows source class, columns decoded class)
+    if source.shape != decoded.shape:
+        raise ValueError(f"Label maps differ in shape: {source.shape} and {decoded.shape}")
+
+    if mask is not None:
+        source, decoded = source[mask], decoded[mask]
+
+    source = np.clip(source, 0, classes - 1).astype(np.int64).ravel()
+    decoded = np.clip(decoded, 0, classes - 1).astype(np.int64).ravel()
+
+    confusion = np.bincount(source * classes + decoded, minlength = classes * classes)
+    confusion = confusion.reshape(classes, classes)
+
+    pixels = source.size
+    if pixels == 0:
+        return {'pixels': 0, 'accuracy': None, 'mae': None, 'confusion': confusion}
+
+    return {
+        'pixels': int(pixels),
+        'accuracy': float(np.trace(confusion) / pixels),
+        'mae': float(np.mean(np.abs(source - decoded))),
+        'confusion': confusion
+    }
+
+
+def psnr(source, restored, mask = None, peak = 255.0):
+    # input: uint8 array (x,y,3) - source RGB image
+    # input: uint8 array (x,y,3) - restored RGB image, same shape
+    # input: bool array (x,y)    - optional pixels to compare
+    # input: float               - largest pixel value
+    # output: float - peak signal-to-noise ratio in dB (inf when identical),
+    #                 or None when there is nothing to compare
+    if source.shape != restored.shape:
+        raise ValueError(f"Images differ in shape: {source.shape} and {restored.shape}")
+
+    if mask is not None:
+        source, restored = source[mask], restored[mask]
+    if source.size == 0:
+        return None
+
+    mse = np.mean((source.astype(np.float64) - restored.astype(np.float64)) ** 2)
+    if mse == 0:
+        return float('inf')
+
+    return float(10 * np.log10(peak * peak / mse))
+
+
+def confusion_rows(confusion):
+    # input: int array (classes x classes) - confusion matrix
+    # output: list of (source class, decoded class, count) for the non-zero cells
+    source, decoded = np.nonzero(confusion)
+    return list(zip(source.tolist(), decoded.tolist(), confusion[source, decoded].tolist()))
@@ -1,37 +1,95 @@
 import numpy as np
-import imageio
-import cv2 as cv
 
 # The purpose of this file is to define functions to create and 
 # manipulate a plot of scalars from an image file, particularly
 # an image which uses a color scale to depict information on a
 # map.
 
-def build_scale(raw):
-    # input: np array (x,3)  - slice of an image
-    # output: np array (x,3) - return an array of BGR integers
-    bw_count = len(raw)
+def scale_runs(slices):
+    # input: np array (n,x,3) - n slices of an image
+    # output: list (n)        - (colors, lengths, bw) runs of identical pixels
+    #                           along each slice; bw marks black or white runs
+    slices = np.asarray(slices).astype(np.int64)
+    n, x = slices.shape[:2]
+
+    starts = np.ones((n, x), dtype = bool)
+    starts[:, 1:] = np.any(slices[:, 1:] != slices[:, :-1], axis = 2)
+    bw = np.all(slices > 250, axis = 2) | np.all(slices < 5, axis = 2)
+
+    rows, cols = np.nonzero(starts)
+    ends = np.append(cols[1:], 0)
+    ends[np.append(rows[1:] != rows[:-1], True)] = x
+    lengths = ends - cols
+    colors = slices[rows, cols]
+    run_bw = bw[rows, cols]
+
+    splits = np.searchsorted(rows, np.arange(1, n))
+    return list(zip(np.split(colors, splits), np.split(lengths, splits), np.split(run_bw, splits)))
+
+
+def build_scale_runs(colors, lengths, bw, bw_count):
+    # input: np array (k,3) - color of each run along a slice
+    # input: np array (k)   - length of each run
+    # input: np array (k)   - True for black or white runs
+    # input: int            - initial black/white count (the slice length)
+    # output: list (x,3)    - longest sequence of distinct colors between
+    #                         black/white gaps, see build_scale
     out = []
     out_temp = []
-    r_last = [-1,-1,-1]
-
-    for r in raw:
-        # filter out black and white and check RGB not same as last
-        if (not all(r > 250)
-                and not all(r < 5)
-                and np.linalg.norm(r-r_last) >= 5):
-            if bw_count > 10: 
-                out_temp = [[int(r[0]), int(r[1]), int(r[2])]]
-            else: 
-                out_temp.append([int(r[0]), int(r[1]), int(r[2])])
-
-            if len(out_temp) > len(out): 
+    r_last = (-1, -1, -1)
+
+    for r, n, is_bw in zip(colors.tolist(), lengths.tolist(), bw.tolist()):
+        if is_bw:
+            bw_count += n
+            continue
+
+        # only the first pixel of a run can differ from the last color
+        if ((r[0] - r_last[0])**2 + (r[1] - r_last[1])**2
+                + (r[2] - r_last[2])**2) >= 25:
+            if bw_count > 10:
+                out_temp = [r]
+            else:
+                out_temp.append(r)
+
+            if len(out_temp) > len(out):
                 out = out_temp.copy()
-            r_last = r.copy()
+            r_last = r
             bw_count = 0
 
-        elif all(r > 250) or all(r < 5):
-            bw_count += 1
+    return out
+
+
+def build_scale(raw):
+    # input: np array (x,3)  - slice of an image
+    # output: np array (x,3) - return an array of BGR integers
+    colors, lengths, bw = scale_runs(np.asarray(raw)[None])[0]
+    return build_scale_runs(colors, lengths, bw, len(raw))
+
+
+def best_scale(box, vertical, step = 2, enough = 15):
+    # input: np array (y,x,3) - scale bar area of an image
+    # input: bool             - True if the colors run top to bottom
+    # input: int              - spacing of the slices tried across the bar
+    # input: int              - stop at the first slice with this many colors
+    # output: list (x,3)      - longest scale found by build_scale on the slices
+    box = np.asarray(box)
+    end = min(box.shape[0], box.shape[1])
+    if vertical:
+        slices = box[:, step:end:step].transpose(1, 0, 2)
+    else:
+        slices = box[step:end:step]
+
+    out = []
+    if len(slices) == 0:
+        return out
+
+    length = slices.shape[1]
+    for colors, lengths, bw in scale_runs(slices):
+        extracted = build_scale_runs(colors, lengths, bw, length)
+        if len(extracted) > len(out):
+            out = extracted
+            if len(out) >= enough:
+                break
 
     return out
 
@@ -40,29 +98,29 @@ def lrtb(image):
     # input: np array (x,y,3) - image with a black/white border
     # output: integers (4)    - top, bottom, left, right of the colorful area
     def bound(mask_bounds,offset):
-        begin, end = len(mask_bounds[0,:]), 0
-        found = False
-        temp = 0
-        for be in range(len(mask_bounds[0,:])):
-            if np.sum(mask_bounds[:,be]) > 0 and not found:
-                found = True
-                temp = be
-            elif np.sum(mask_bounds[:,be]) == 0 and found:
-                found = False
-                if be - temp > end - begin:
-                    end = be
-                    begin = temp
-        if found:
-            if be - temp > end - begin:
-                end = be
-                begin = temp
-        return [begin + offset, end + offset]
+        # longest run of columns containing any colorful pixel; the first
+        # run wins ties, and a run touching the last column ends one short
+        cols = mask_bounds.shape[1]
+        active = np.zeros(cols + 2, dtype = np.int8)
+        active[1:-1] = mask_bounds.any(axis = 0)
+        edges = np.diff(active)
+        begins = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        if len(begins) == 0:
+            return [cols + offset, offset]
+
+        if ends[-1] == cols:
+            ends[-1] = cols - 1
+        k = np.argmax(ends - begins)
+
+        return [int(begins[k]) + offset, int(ends[k]) + offset]
     
 
     mask = np.zeros_like(image[:,:,0]).astype(bool)
 
     for i in range(3):
-        mask = mask + np.multiply(image[:,:,i] > 10, image[:,:,i] < 245)
+        mask |= (image[:,:,i] > 10) & (image[:,:,i] < 245)
 
     l, r, t, b = 0, len(mask[0,:]) - 1, 0, len(mask[:,0]) - 1
 
@@ -84,58 +142,138 @@ def edge_mean(plt):
     return 0
 
 
-def gen(image, scale):
+def pack_rgb(image):
+    # input: np array (x,y,3) - uint8 image with RGB values
+    # output: np array (x,y)  - each pixel's RGB packed into one integer
+    out = image[:,:,0].astype(np.int32) << 16
+    out |= image[:,:,1].astype(np.int32) << 8
+    out |= image[:,:,2]
+
+    return out
+
+
+def scale_keys(scale):
+    # input: np array (x,3) - scale of RGB values in order of magnitude
+    # output: np array (k,) - sorted packed RGB values within +/-1 of a scale
+    #                         color on each channel
+    # output: np array (k,) - scale value (index + 1) of each packed RGB.
+    #                         Earlier scale colors win where two colors
+    #                         overlap, as in gen.
+    scale = np.asarray(scale).astype(np.int64)
+    offsets = np.array([[i, j, k] for i in (-1,0,1) for j in (-1,0,1) for k in (-1,0,1)])
+
+    near = scale[:,None,:] + offsets[None,:,:]
+    valid = np.all((near >= 0) & (near <= 255), axis = 2)
+    keys = (near[:,:,0] << 16) | (near[:,:,1] << 8) | near[:,:,2]
+    vals = np.broadcast_to(np.arange(1, len(scale) + 1)[:,None], keys.shape)
+
+    # keys are ordered by scale index, so the first occurrence is the winner
+    keys, first = np.unique(keys[valid], return_index = True)
+
+    return keys, vals[valid][first]
+
+
+def scale_lut(scale, keys = None, vals = None):
+    # input: np array (x,3)     - scale of RGB values in order of magnitude
+    # input: np arrays          - optional precomputed scale_keys(scale)
+    # output: np array (2**24,) - scale value (index + 1) for every packed RGB
+    #                             within +/-1 of a scale color on each channel,
+    #                             0 elsewhere
+    if keys is None: keys, vals = scale_keys(scale)
+
+    out = np.zeros(1 << 24, dtype = np.uint8 if len(scale) < 256 else np.uint16)
+    out[keys] = vals
+
+    return out
+
+
+def gen(image, scale, lut = None, bounds = None, lean = False):
     # input: np array (x,y,3) - image with RGB values
     # input: np array (x,3)   - scale of RGB values in order of magnitude
+    # input: np array         - optional precomputed scale_lut(scale)
+    # input: integers (4)     - optional lrtb(image), when already known
+    # input: bool             - keep the plot in uint8 (uint16 past 255 colors)
     # output: np array (x,y)  - grayscale plot with values centered at zero
-    l,r,t,b = lrtb(image)
-    out = np.zeros_like(image[t:b,l:r,0])
+    l,r,t,b = lrtb(image) if bounds is None else bounds
+
+    exact = np.array_equal(np.asarray(scale), np.round(scale))
+    if image.dtype == np.uint8 and len(scale) > 0 and exact:
+        # single pass: look every pixel's packed RGB up in the scale table
+        if lut is None: lut = scale_lut(scale)
+        out = lut[pack_rgb(image[t:b,l:r])]
+        if not lean: out = out.astype(int)
 
-    for i in range(len(scale)):
-        mask = out == 0
-        for j in range(3): 
-            mask = np.multiply(mask, abs(image[t:b,l:r,j] - scale[i][j]) < 2)
-        out = out + (mask.astype(int) * (i + 1))
+    else:
+        out = np.zeros_like(image[t:b,l:r,0])
+
+        for i in range(len(scale)):
+            mask = out == 0
+            for j in range(3):
+                mask = np.multiply(mask, abs(image[t:b,l:r,j] - scale[i][j]) < 2)
+            out = out + (mask.astype(int) * (i + 1))
+
+        if lean: out = out.astype(np.uint8 if len(scale) < 256 else np.uint16)
 
     out = out - edge_mean(out)
 
     return out
 
 
-def smooth(plt, repeat):
+# Neighbours averaged by smooth, as (row, col) offsets, in summation order.
+# These are the cells visited by the original sequence of np.roll calls;
+# (-1,+1) is not among them.
+SMOOTH_NEIGHBOURS = [(-1,0),(-1,-1),(0,-1),(1,-1),(1,0),(1,1),(0,1)]
+
+
+def smooth(plt, repeat, dtype = np.float64):
     # input: np array (x,y) - grayscale plot
     # input: int            - number of times to repeat the smoothing fn
+    # input: dtype          - float type to smooth in (float32 halves memory)
+    # Every empty (zero) cell takes the mean of its nonzero neighbours;
+    # the outer ring of the plot is treated as empty. Neighbour sums are
+    # taken from slices of one zero-padded buffer, in the same order as
+    # before, so results are bit-identical to the np.roll version.
     out = np.array(plt - np.min(plt))
+    if repeat < 1: return out - edge_mean(out)
+
+    out = out.astype(dtype)
+    x, y = out.shape
+    pad = np.zeros((x + 2, y + 2), dtype = dtype)
+    filled = np.zeros((x + 2, y + 2), dtype = np.uint8)
+    add = np.empty_like(out)
+    cnt = np.empty(out.shape, dtype = np.uint8)
+    mask = np.empty(out.shape, dtype = bool)
+
+    sums = [pad[1+i:1+i+x, 1+j:1+j+y] for (i,j) in SMOOTH_NEIGHBOURS]
+    counts = [filled[1+i:1+i+x, 1+j:1+j+y] for (i,j) in SMOOTH_NEIGHBOURS]
 
     for r in range(repeat):
-        tmp = np.pad(
-            out[1:plt.shape[0]-1, 1:out.shape[1]-1],
-            (1,),
-            'constant',
-            constant_values = 0
-        )
-        add = np.zeros_like(out).astype(np.float64)
-        cnt = np.zeros_like(out).astype(np.float64)
+        # interior of out; both rings around it stay zero
+        pad[2:x, 2:y] = out[1:x-1, 1:y-1]
+        np.not_equal(pad, 0, out = filled.view(bool))
 
-        for (i,j) in [(1,0),(1,1),(-1,0),(-1,0),(-1,1),(-1,1),(1,0)]:
-            tmp = np.roll(tmp, i, axis = j)
-            add = add + tmp
-            cnt = (cnt + np.array(tmp != 0).astype(type(cnt[0,0])))
+        add.fill(0)
+        cnt.fill(0)
+        for v, c in zip(sums, counts):
+            add += v
+            cnt += c
 
-        add = np.divide(add, cnt, out = np.zeros_like(add), where=cnt!=0)
-        mask = np.array(out == 0).astype(np.float64)
-        out = out + np.multiply(add, mask)
+        np.not_equal(cnt, 0, out = mask)
+        np.divide(add, cnt, out = add, where = mask)
+        np.equal(out, 0, out = mask)
+        np.copyto(out, add, where = mask)
 
     out = out - edge_mean(out)
 
     return out
 
 
-def condition(plt,padding):
+def condition(plt, padding, dtype = np.float64):
     # input: np array (x,y)              - grayscale plot
+    # input: dtype                       - float type to smooth in
     # output: np array (x+2*pad,y+2*pad) - grayscale plot
     plt = np.pad(plt, pad_width = padding, mode='symmetric')
-    plt = smooth(plt,10)
+    plt = smooth(plt, 10, dtype)
 
     return plt
 
@@ -146,6 +284,9 @@ def restore(plt, fp, scale, dtg):
     # input: np array (x,3)   - scale of RGB values in order of magnitude
     # input: string           - date, time, group
     # output: np array (x,y,3)- output image
+    import imageio
+    import cv2 as cv
+
     out = imageio.mimread(fp.template)[0]
     x, y = out.shape[:2]
     l, r, t, b = lrtb(out)
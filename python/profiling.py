@@ -0,0 +1,121 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# The purpose of this file is to measure the ARGUS pipeline one stage at a
+# time: wall time and the peak memory allocated inside each stage. The
+# pipeline functions take an optional profiler and wrap each stage in
+# stage(profiler, name), which does nothing when no profiler is given.
+
+
+def reset_peak_rss():
+    # output: bool - True if the process peak RSS was reset (Linux only), so
+    #                that peak_rss() covers only what runs afterwards
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    # output: int - peak resident set size of the process in bytes, or None
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class StageProfiler:
+    # Collects, per stage name: calls, total seconds and peak bytes allocated
+    # above the memory in use when the stage started. Memory is traced with
+    # tracemalloc, which slows Python-heavy stages, so time and memory are
+    # best measured in separate runs (memory = False for timing runs).
+    # Memory runs also record the peak RSS of the process during the stage
+    # (peak_rss_bytes); where the peak cannot be reset (outside Linux) this
+    # is the process peak so far.
+
+    def __init__(self, memory = False):
+        self.memory = memory
+        self.stages = {}
+        self.total_seconds = None
+
+    @contextmanager
+    def stage(self, name):
+        started = not tracemalloc.is_tracing()
+        if self.memory:
+            if started: tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            reset_peak_rss()
+
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            peak, rss = 0, None
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                rss = peak_rss()
+                if started: tracemalloc.stop()
+
+            s = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'peak_bytes': 0, 'peak_rss_bytes': None})
+            s['calls'] += 1
+            s['seconds'] += seconds
+            s['peak_bytes'] = max(s['peak_bytes'], peak)
+            if rss is not None:
+                s['peak_rss_bytes'] = max(s['peak_rss_bytes'] or 0, rss)
+
+    def report(self):
+        # output: dict - {stage: {'calls', 'seconds', 'peak_bytes', 'peak_rss_bytes'}} in the
+        #                order the stages first ran
+        return {name: dict(s) for name, s in self.stages.items()}
+
+    def timings(self):
+        # output: dict - {'stages': report(), 'total_seconds'} for JSON results
+        return {'stages': self.report(), 'total_seconds': self.total_seconds}
+
+
+@contextmanager
+def profile_run(enabled, dump_path = None):
+    # input: bool   - collect per-stage timings and memory
+    # input: string - optional path for a cProfile dump of the whole run
+    # output: context manager yielding a StageProfiler (or None when not
+    #         enabled); its total_seconds is set when the run ends
+    profiler = StageProfiler(memory = True) if enabled else None
+    cprof = None
+    if dump_path:
+        import cProfile
+        cprof = cProfile.Profile()
+        cprof.enable()
+
+    t0 = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        if cprof is not None:
+            cprof.disable()
+            cprof.dump_stats(dump_path)
+        if profiler is not None:
+            profiler.total_seconds = time.perf_counter() - t0
+
+
+def stage(profiler, name):
+    # input: StageProfiler or None
+    # input: string - stage name
+    # output: context manager timing the stage, or doing nothing
+    return profiler.stage(name) if profiler is not None else nullcontext()
@@ -0,0 +1,149 @@
+import os
+import zipfile
+import numpy as np
+import fileUtils
+
+# The purpose of this file is to keep a compiled copy of each template next
+# to its YAML config (<name>.npz) holding everything compress and decompress
+# derive from the template: the scale, the decoded template image, its
+# bounds, the red marker mask and the color classification keys. The
+# compiled file is rebuilt whenever the YAML or GIF changes, and it is
+# replaced atomically so concurrent processes never read a partial file.
+
+# Bump when the contents of the compiled file change
+COMPILED_VERSION = 1
+
+# Red marker painted into templates where chart colors go
+MARKER_COLOR = [125, 0, 0]
+MARKER_VARIANCE = 25
+
+# Compiled templates already loaded by this process, keyed by config path
+_loaded = {}
+
+
+def compiled_path(config_path):
+    # input: string - template YAML path
+    # output: string - compiled template path
+    return os.path.splitext(config_path)[0] + '.npz'
+
+
+def source_stamp(config_path, template_path):
+    # input: string - template YAML path
+    # input: string - template GIF path
+    # output: np array (4,) - mtime and size of both files
+    stamp = fileUtils.file_stamp(config_path) + fileUtils.file_stamp(template_path)
+    return np.array(stamp, dtype = np.int64)
+
+
+def marker_mask(image):
+    # input: np array (x,y,3) - template image
+    # output: np array (x,y)  - True where the template has the red marker
+    out = np.ones(image.shape[:2], dtype = bool)
+    for i in range(3):
+        out &= np.abs(image[:,:,i].astype(np.int16) - MARKER_COLOR[i]) < MARKER_VARIANCE
+
+    return out
+
+
+def compile_template(config_path, template_path):
+    # input: string - template YAML path
+    # input: string - template GIF path
+    # output: dict  - arrays stored in the compiled template
+    import imageio.v2 as imageio
+    import yaml
+    import plot
+
+    stamp = source_stamp(config_path, template_path)
+
+    with open(config_path, 'r') as f:
+        c = yaml.safe_load(f)
+
+    template_data = imageio.mimread(template_path)
+    if isinstance(template_data, list) and len(template_data) > 0:
+        image = template_data[0]
+    else:
+        image = imageio.imread(template_path)
+    image = np.array(image)
+
+    scale = np.array(c['scale']).astype(np.int64).reshape(-1, 3)
+    keys, vals = plot.scale_keys(scale)
+
+    return {
+        'version': np.array(COMPILED_VERSION),
+        'stamp': stamp,
+        'scale': scale,
+        'image': image,
+        'bounds': np.array(plot.lrtb(image), dtype = np.int64),
+        'marker': marker_mask(image),
+        'lut_keys': keys.astype(np.uint32),
+        'lut_vals': vals.astype(np.uint16)
+    }
+
+
+def read_compiled(path, stamp):
+    # input: string        - compiled template path
+    # input: np array (4,) - expected source stamp
+    # output: dict         - stored arrays, or None if missing, stale or unreadable
+    try:
+        with np.load(path) as data:
+            if (int(data['version']) != COMPILED_VERSION
+                    or not np.array_equal(data['stamp'], stamp)):
+                return None
+            return {k: data[k] for k in data.files}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def write_compiled(path, arrays):
+    # input: string - compiled template path
+    # input: dict   - arrays to store
+    # Written atomically (fileUtils.write_atomic). Failures (e.g. read-only
+    # bundled templates) are ignored; the template is then compiled in memory
+    # on every cold start.
+    try:
+        fileUtils.write_atomic(path, lambda f: np.savez_compressed(f, **arrays))
+    except OSError:
+        pass
+
+
+def load(config_path, template_path):
+    # input: string - template YAML path
+    # input: string - template GIF path
+    # output: dict  - compiled template:
+    #   'scale' (x,3) int64, 'image' (h,w,c) uint8, 'bounds' [l,r,t,b],
+    #   'marker' (h,w) bool, 'lut_keys'/'lut_vals' (see plot.scale_keys),
+    #   'config_path', 'template_path'. Arrays are read-only.
+    stamp = source_stamp(config_path, template_path)
+
+    cached = _loaded.get(config_path)
+    if (cached is not None and cached['template_path'] == template_path
+            and np.array_equal(cached['stamp'], stamp)):
+        return cached
+
+    path = compiled_path(config_path)
+    arrays = read_compiled(path, stamp)
+    if arrays is None:
+        arrays = compile_template(config_path, template_path)
+        write_compiled(path, arrays)
+
+    for a in arrays.values(): a.setflags(write = False)
+
+    out = dict(arrays)
+    out['bounds'] = [int(k) for k in arrays['bounds']]
+    out['config_path'] = config_path
+    out['template_path'] = template_path
+    _loaded[config_path] = out
+
+    return out
+
+
+def lut(template):
+    # input: dict            - compiled template from load
+    # output: np array (2**24,) - dense color classification table (plot.scale_lut)
+    # Built on first use and kept with the template, since only the encoder needs it.
+    import plot
+
+    if 'lut' not in template:
+        template['lut'] = plot.scale_lut(template['scale'], template['lut_keys'], template['lut_vals'])
+
+    return template['lut']
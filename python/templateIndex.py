@@ -0,0 +1,125 @@
+import os
+import json
+import fileUtils
+
+# The purpose of this file is to keep an index of the templates under a
+# templates root, so list-templates does not parse every YAML and GIF on
+# each call. The index is kept in <root>/.argus/template_index.json. The
+# directory listing is reused while the root's mtime is unchanged, and a
+# template is only re-parsed when the stamp of its YAML or GIF changes.
+# Read-only roots (e.g. the bundled templates inside the app) are indexed
+# in memory on every call.
+
+# The index lives in a subdirectory so rewriting it does not touch the root's mtime
+INDEX_DIR = '.argus'
+INDEX_NAME = 'template_index.json'
+
+# Bump when the contents of an entry change
+INDEX_VERSION = 1
+
+
+def gif_dimensions(path):
+    # input: string - GIF path
+    # output: tuple - logical screen (width, height) read from the GIF header
+    #                 without decoding the image, or (None, None)
+    with open(path, 'rb') as f:
+        header = f.read(10)
+    if len(header) < 10 or not header.startswith(b'GIF'):
+        return None, None
+
+    return int.from_bytes(header[6:8], 'little'), int.from_bytes(header[8:10], 'little')
+
+
+def index_entry(config_path, template_path, stamp):
+    # input: string - template YAML path
+    # input: string - template GIF path
+    # input: list   - stamps of both files (fileUtils.file_stamp)
+    # output: dict  - 'stamp', 'scale_colors', 'width', 'height', 'sha1'
+    import hashlib
+    import yaml
+
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+
+    sha1 = hashlib.sha1()
+    for path in (config_path, template_path):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+
+    width, height = gif_dimensions(template_path)
+    return {
+        'stamp': stamp,
+        'scale_colors': len(config.get('scale', [])),
+        'width': width,
+        'height': height,
+        'sha1': sha1.hexdigest()
+    }
+
+
+def read_index(path):
+    # input: string - index path
+    # output: dict  - stored index, or {} if missing, stale or unreadable
+    try:
+        with open(path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        return {}
+
+    return index
+
+
+def load(templates_dir):
+    # input: string - templates root
+    # output: dict  - {name: entry (see index_entry)} for every valid template
+    index_dir = os.path.join(templates_dir, INDEX_DIR)
+    index_path = os.path.join(index_dir, INDEX_NAME)
+    try:
+        os.makedirs(index_dir, exist_ok = True)
+    except OSError:
+        pass
+
+    index = read_index(index_path)
+
+    root_mtime = os.stat(templates_dir).st_mtime_ns
+    if index.get('root_mtime') == root_mtime:
+        names = index.get('dirs', [])
+    else:
+        names = sorted(item for item in os.listdir(templates_dir)
+                       if not item.startswith('.')
+                       and os.path.isdir(os.path.join(templates_dir, item)))
+
+    old_entries = index.get('templates', {})
+    entries = {}
+    for item in names:
+        config_path = os.path.join(templates_dir, item, f"{item}.yaml")
+        template_path = os.path.join(templates_dir, item, f"{item}_template.gif")
+        try:
+            stamp = fileUtils.file_stamp(config_path) + fileUtils.file_stamp(template_path)
+        except OSError:
+            continue
+
+        entry = old_entries.get(item)
+        if entry is None or entry.get('stamp') != stamp:
+            try:
+                entry = index_entry(config_path, template_path, stamp)
+            except Exception:
+                continue
+        entries[item] = entry
+
+    updated = {
+        'version': INDEX_VERSION,
+        'root_mtime': root_mtime,
+        'dirs': names,
+        'templates': entries
+    }
+    if updated != index:
+        try:
+            fileUtils.write_atomic(index_path, lambda f: json.dump(updated, f, indent = 1), 'w')
+        except OSError:
+            pass
+
+    return entries
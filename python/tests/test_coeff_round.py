@@ -0,0 +1,66 @@
+"""
+The vectorized quantizer (coeff_round_array / coeff_unround_array) must match
+the scalar coeff_round / coeff_unround exactly for every value in [-1000, 1000].
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import textCompression as tc
+
+
+def scalar_round(values):
+    with np.errstate(divide = 'ignore'):
+        return np.array([tc.coeff_round(v) for v in values])
+
+
+def neighbours(values, steps = 3):
+    """values and their float neighbours, up to steps ulps either side"""
+    out = [values]
+    up = down = values
+    for _ in range(steps):
+        up = np.nextafter(up, np.inf)
+        down = np.nextafter(down, -np.inf)
+        out += [up, down]
+    return np.concatenate(out)
+
+
+def check_round(values):
+    values = np.asarray(values, dtype = np.float64)
+    expected = scalar_round(values)
+    actual = tc.coeff_round_array(values)
+
+    mismatch = np.flatnonzero(actual != expected)
+    assert mismatch.size == 0, [(values[k], expected[k], actual[k]) for k in mismatch[:10]]
+
+
+def test_round_integers():
+    check_round(np.arange(-1000, 1001))
+
+
+def test_round_grid():
+    check_round(np.linspace(-1000, 1000, 40001))
+
+
+def test_round_bin_edges():
+    edges, _ = tc.coeff_tables()
+    edges = 10 ** edges
+    check_round(neighbours(np.concatenate([edges, -edges])))
+
+
+def test_round_zero_and_limits():
+    check_round([0.0, -0.0, 5e-324, -5e-324])
+    check_round(neighbours(np.array([1000.0, -1000.0])))
+    check_round([1000.5, -1000.5, 1001, -1001, 1e6, -1e6])
+
+
+def test_unround_every_index():
+    indices = np.arange(len(tc.char_list()) + 1)
+    expected = np.array([tc.coeff_unround(k) for k in indices], dtype = np.float64)
+    actual = tc.coeff_unround_array(indices)
+
+    assert np.array_equal(actual, expected)
@@ -0,0 +1,84 @@
+"""
+plot.smooth must stay bit-identical to the original np.roll implementation,
+kept frozen below, on the bundled examples.
+"""
+
+import os
+import sys
+
+import numpy as np
+import imageio.v2 as imageio
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plot
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EXAMPLES = ['EUCOM', 'LANT']
+
+
+def roll_smooth(plt, repeat):
+    # plot.smooth before it was rewritten with in-place neighbour sums
+    out = np.array(plt - np.min(plt))
+
+    for r in range(repeat):
+        tmp = np.pad(
+            out[1:plt.shape[0]-1, 1:out.shape[1]-1],
+            (1,),
+            'constant',
+            constant_values = 0
+        )
+        add = np.zeros_like(out).astype(np.float64)
+        cnt = np.zeros_like(out).astype(np.float64)
+
+        for (i,j) in [(1,0),(1,1),(-1,0),(-1,0),(-1,1),(-1,1),(1,0)]:
+            tmp = np.roll(tmp, i, axis = j)
+            add = add + tmp
+            cnt = (cnt + np.array(tmp != 0).astype(type(cnt[0,0])))
+
+        add = np.divide(add, cnt, out = np.zeros_like(add), where=cnt!=0)
+        mask = np.array(out == 0).astype(np.float64)
+        out = out + np.multiply(add, mask)
+
+    out = out - plot.edge_mean(out)
+
+    return out
+
+
+def roll_condition(plt, padding):
+    # plot.condition on top of roll_smooth
+    plt = np.pad(plt, pad_width = padding, mode='symmetric')
+    return roll_smooth(plt, 10)
+
+
+def example_labels(name):
+    """plot.gen labels of examples/<name>_source.gif against the <name> template"""
+    with open(os.path.join(REPO_DIR, 'templates', name, f'{name}.yaml'), 'r') as f:
+        scale = np.array(yaml.safe_load(f)['scale'])
+
+    image = np.asarray(imageio.mimread(os.path.join(REPO_DIR, 'examples', f'{name}_source.gif'))[0])
+    return plot.gen(image, scale)
+
+
+@pytest.mark.parametrize('name', EXAMPLES)
+def test_condition_matches_roll_version(name):
+    plt = example_labels(name)
+
+    expected = roll_condition(plt, 50)
+    actual = plot.condition(plt, 50)
+
+    assert actual.dtype == expected.dtype
+    assert np.array_equal(actual, expected)
+
+
+@pytest.mark.parametrize('name', EXAMPLES)
+def test_smooth_matches_roll_version(name):
+    plt = example_labels(name)
+
+    expected = roll_smooth(plt, 2)
+    actual = plot.smooth(plt, 2)
+
+    assert actual.dtype == expected.dtype
+    assert np.array_equal(actual, expected)
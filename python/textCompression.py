@@ -1,4 +1,6 @@
 import os
+import bisect
+import functools
 import numpy as np
 
 def char_list():
@@ -46,6 +48,102 @@ def dft_mapping(n):
     return out
 
 
+@functools.lru_cache(maxsize = 32)
+def dft_index(x, n):
+    # input: int - number of rows in the DFT
+    # input: int - number of one side of coefficients
+    # output: int arrays - row and column of every coefficient in message
+    #                      order; each dft_mapping(n) address is read at
+    #                      rows i and x-i-1
+    address = np.array(dft_mapping(n))
+    rows = np.stack([address[:,0], x - address[:,0] - 1], axis = 1).ravel()
+    cols = np.repeat(address[:,1], 2)
+
+    rows.setflags(write = False)
+    cols.setflags(write = False)
+
+    return rows, cols
+
+
+def dft_rows(x, n):
+    # input: int - number of rows in the DFT
+    # input: int - number of one side of coefficients
+    # output: list - DFT rows read by msgdata_write (i and x-i-1)
+    return sorted(set(list(range(n)) + list(range(x - n, x))))
+
+
+@functools.lru_cache(maxsize = 8)
+def dft_basis(shape, n, dtype = np.float64):
+    # input: tuple (x,y) - plot shape
+    # input: int         - number of one side of coefficients
+    # input: dtype       - float type of the returned bases
+    # output: float arrays - cos/sin bases for the partial transform:
+    #   column frequencies 0..n (y, n+1) and the row frequencies needed to
+    #   fill the CCS entries read by msgdata_write (u, x)
+    x, y = shape
+    rows = dft_rows(x, n)
+
+    # column 0 of the CCS layout packs Re/Im of the first spectrum column
+    # vertically: row 2m-1 holds Re Y[m,0] and row 2m holds Im Y[m,0]
+    freqs = sorted(set(rows) | set((r + 1) // 2 for r in rows))
+
+    q = np.arange(y)[:,None] * np.arange(n + 1)[None,:]
+    col_cos = np.cos(2 * np.pi * q / y)
+    col_sin = np.sin(2 * np.pi * q / y)
+
+    p = np.array(freqs)[:,None] * np.arange(x)[None,:]
+    row_cos = np.cos(2 * np.pi * p / x)
+    row_sin = np.sin(2 * np.pi * p / x)
+
+    col_cos, col_sin, row_cos, row_sin = [a.astype(dtype, copy = False)
+                                          for a in (col_cos, col_sin, row_cos, row_sin)]
+    for a in (col_cos, col_sin, row_cos, row_sin): a.setflags(write = False)
+
+    return col_cos, col_sin, row_cos, row_sin, freqs
+
+
+def dft_truncated(plt, n, dtype = np.float64):
+    # input: np array (x,y) - conditioned plot
+    # input: int            - number of one side of coefficients
+    # input: dtype          - float type to transform in
+    # output: float array   - cv.dft(plt) in its packed (CCS) layout, with only
+    #                         the entries that msgdata_write(dft, n) reads
+    #                         filled in; everything else is zero
+    # The coefficients come from products with partial DFT basis matrices,
+    # so the cost grows with n instead of with a full transform. Plots the
+    # shortcut cannot cover fall back to the full transform.
+    x, y = plt.shape
+    if x <= 2 * n or y <= 2 * n or np.min(plt) < 0:
+        import cv2 as cv
+        return cv.dft(plt.astype(dtype))
+
+    col_cos, col_sin, row_cos, row_sin, freqs = dft_basis((x, y), n, dtype)
+    plt = np.asarray(plt, dtype = dtype)
+
+    # transform along rows for column frequencies 0..n, then along columns
+    # for the needed row frequencies: Y = (C - iS)(Ac - iAs)
+    a_cos = plt @ col_cos
+    a_sin = plt @ col_sin
+    re = row_cos @ a_cos - row_sin @ a_sin
+    im = -(row_sin @ a_cos + row_cos @ a_sin)
+
+    out = np.zeros((x, y), dtype = dtype)
+    where = {u: k for k, u in enumerate(freqs)}
+
+    for r in dft_rows(x, n):
+        u = where[r]
+        out[r, 1:2*n:2] = re[u, 1:n+1]
+        out[r, 2:2*n:2] = im[u, 1:n]
+        if r == 0:
+            out[r, 0] = re[where[0], 0]
+        elif r % 2:
+            out[r, 0] = re[where[(r + 1) // 2], 0]
+        else:
+            out[r, 0] = im[where[r // 2], 0]
+
+    return out
+
+
 def coeff_round(x):
     # input: int - number between -1000 and 1000
     # output: int - number between 0 and len(char_list)
@@ -85,6 +183,51 @@ def coeff_unround(x):
     return out
 
 
+@functools.lru_cache(maxsize = 1)
+def coeff_tables():
+    # output: float array - log10 bin edges used by coeff_round (i*dx, i = 1..m_char)
+    # output: float array - coeff_unround value for every character index
+    m_int = 1000
+    m_char = (len(char_list()) - 1) // 2
+    dx = np.log10(m_int) / m_char
+
+    edges = np.arange(1, m_char + 1) * dx
+    values = np.array([coeff_unround(k) for k in range(len(char_list()) + 1)], dtype = np.float64)
+
+    edges.setflags(write = False)
+    values.setflags(write = False)
+
+    return edges, values
+
+
+def coeff_round_array(x):
+    # input: float array - numbers between -1000 and 1000
+    # output: int array  - coeff_round of every element
+    x = np.asarray(x, dtype = np.float64)
+    edges, _ = coeff_tables()
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        x_log = np.log10(np.abs(x))
+
+    # bin i satisfies i*dx < x_log <= (i+1)*dx, for i in 1..m_char-1
+    i = np.digitize(x_log, edges, right = True)
+    out = np.where((i >= 1) & (i < len(edges)), 2 * i, 0) + (x < 0)
+    out[np.abs(x) > 1000] = 0
+
+    return out
+
+
+def coeff_unround_array(x):
+    # input: int array   - character indices (0 to len(char_list))
+    # output: float array - coeff_unround of every element
+    x = np.asarray(x, dtype = np.int64)
+    _, values = coeff_tables()
+
+    valid = (x >= 0) & (x < len(values))
+
+    return np.where(valid, values[np.where(valid, x, 0)], 0.0)
+
+
 def change_basis(num,b1,b2):
     # Convert num in base b1 to a number in base b2
     # input: int array - an array of integers representing the digits in
@@ -142,81 +285,387 @@ def msgdata_write(dft,n):
     # input: dict - configuration file
     # input: dict - plot specific variables (i.e. x, y, max, n, etc.)
     # output: string - message output
-    dft_address = dft_mapping(n)
-    dft_flat = []
+    rows, cols = dft_index(dft.shape[0], n)
+    dft_flat = coeff_round_array(dft[rows, cols]).tolist()
+    
+    return msgdata_pack(dft_flat)
+
+
+def digit_count(num, b, powers):
+    # input: int        - non-negative integer
+    # input: int        - base
+    # input: int list   - cache of powers of b, extended as needed
+    # output: int       - number of base b digits of num (0 for 0)
+    while powers[-1] <= num: powers.append(powers[-1] * b)
+
+    return bisect.bisect_right(powers, num)
+
+
+def msgdata_pack(dft_flat, width = 67):
+    # input: int list - quantized coefficients in message order
+    # input: int      - maximum number of characters per line after the base character
+    # output: string  - message lines
+    # Each line holds as many coefficients as fit once they are read as one
+    # base (max + 1) number and rewritten in base len(chars); the line starts
+    # with the character of that base. The width of the candidate line is
+    # tracked with a running accumulator, so a line is only converted once.
     chars = char_list()
-    x = dft.shape[0]
-    out = ''
+    powers = [1]
+    out = []
 
-    for [i,j] in dft_address:
-        i1 = [i,x-i-1]
-        for i2 in i1: dft_flat.append(coeff_round(dft[i2,j]))
-    
     beg, end = 0, 2
     dump = False
     line_cap = '\n'
 
+    # running value of dft_flat[beg:top] in base m_d, and its leading zeros
+    top, m_d, acc, lead, nonzero = beg, 1, 0, 0, False
+
     while beg < len(dft_flat):
-        m_d = max(dft_flat[beg:end]) + 1
-        line = change_basis(dft_flat[beg:end], m_d, len(chars))
-        if 67 < len(line):
+        while top < min(end, len(dft_flat)):
+            d = dft_flat[top]
+            top += 1
+            if d + 1 > m_d:
+                m_d = d + 1
+                acc = 0
+                for v in dft_flat[beg:top]: acc = acc * m_d + v
+            else:
+                acc = acc * m_d + d
+            if not nonzero:
+                if d == 0: lead += 1
+                else: nonzero = True
+
+        if width < lead + digit_count(acc, len(chars), powers):
             end -= 1
-            m_d = max(dft_flat[beg:end]) + 1
-            line = change_basis(dft_flat[beg:end], m_d, len(chars))
             dump = True
         elif end >= len(dft_flat):
             line_cap = '/\n'
             dump = True
         if dump:
-            out += str(chars[m_d])
-            for cb in line:
-                out += str(chars[cb])
-            out += line_cap
+            m_d = max(dft_flat[beg:end]) + 1
+            line = change_basis(dft_flat[beg:end], m_d, len(chars))
+            out.append(chars[m_d])
+            out.extend(chars[cb] for cb in line)
+            out.append(line_cap)
 
             beg = end
             end += 1
             dump = False
+            top, m_d, acc, lead, nonzero = beg, 1, 0, 0, False
         end += 1
 
+    return ''.join(out)
+
+
+@functools.lru_cache(maxsize = 1)
+def char_values():
+    # output: int array (256,) - index in char_list of every byte, -1 if absent
+    out = np.full(256, -1, dtype = np.int16)
+    for k, c in enumerate(char_list()): out[ord(c)] = k
+    out.setflags(write = False)
+
     return out
 
 
-def msg_read(msg):
-    # input: string - VLF ARGUS message
-    # output: float array - DFT
-    header, footer = True, False
+def msgbody_read(lines):
+    # input: string list - message body lines, up to the one holding '/'
+    # output: int list   - quantized coefficients in message order
+    chars = char_list()
+    out = []
+
+    # validate the whole body through the byte table in one pass; bodies
+    # with characters outside char_list take the character-by-character path
+    text = np.frombuffer('\n'.join(lines).encode('latin-1', 'replace'), dtype = np.uint8)
+    valid = (char_values()[text] >= 0) | (text == ord('/')) | (text == ord('\n'))
+    if not np.all(valid): return msgbody_read_chars(lines)
+
+    for m in lines:
+        if not m: continue
+        m_d = chars.find(m[0])
+        digits = m[1:].replace('/', '')
+        lead = len(digits) - len(digits.lstrip('0'))
+        dec = int(digits, len(chars)) if digits else 0
+
+        if dec > 0 and m_d < 2:
+            raise ValueError(f"Corrupt message line: {m}")
+
+        line = []
+        while dec > 0:
+            dec, d = divmod(dec, m_d)
+            line.append(d)
+        out.extend([0] * lead)
+        out.extend(line[::-1])
+
+    return out
+
+
+def msgbody_read_chars(lines):
+    # input: string list - message body lines, up to the one holding '/'
+    # output: int list   - quantized coefficients in message order
     chars = char_list()
+    out = []
 
-    for m in msg.splitlines():
-        if header:
-            if 'A1R1G2U3S5' in m:
-                header = False
-                S = m.split('/')
-                x, y, n, max_coeff = [int(k) for k in S[0:4]]
-                dtg = S[4]
-                template = S[5]
-                dft = np.zeros((x,y))
-                dft_address = dft_mapping(n)
-                dft_flat = []
-
-        elif not footer:
-            m_d = chars.find(m[0])
-            line = []
-            for a in m[1:]:
-                if a == '/': footer = True
-                else:        line.append(chars.find(a))
-            line = change_basis(line,len(chars),m_d)
-            for li in line: dft_flat.append(li)
-    k = 0
-    for [i,j] in dft_address:
-        i1 = [i,x-i-1]
-        for i2 in i1:
-            if k < len(dft_flat): 
-                dft[i2,j] = coeff_unround(dft_flat[k])
-                # print(str(i2) + ", " + str(j) + ", " + str(dft_flat[k]))
-            else:
-                None
-                # print(k)
-            k += 1
+    for m in lines:
+        if not m: continue
+        m_d = chars.find(m[0])
+        line = [chars.find(a) for a in m[1:] if a != '/']
+
+        if m_d in (0, 1) and any(line):
+            raise ValueError(f"Corrupt message line: {m}")
+
+        out.extend(change_basis(line, len(chars), m_d))
+
+    return out
+
+
+# Marker on the header line of every ARGUS message
+MSG_HEADER = 'A1R1G2U3S5'
+
+# Marker on the header line of delta messages (see msg_delta_base) instead of
+# MSG_HEADER. Decoders that predate delta messages find no header in them and
+# fail, rather than showing the coded differences as a chart.
+MSG_DELTA_HEADER = 'A1R1G2U3D5'
+
+
+def msg_marker(line):
+    # input: string - message line
+    # output: string - the header marker the line carries (MSG_HEADER or
+    #                  MSG_DELTA_HEADER), None if it is not a header line
+    for marker in (MSG_HEADER, MSG_DELTA_HEADER):
+        if marker in line: return marker
+
+    return None
+
+
+def msg_header(line):
+    # input: string - message header line
+    # output: x, y, n, max_coeff, dtg, template
+    S = line.split('/')
+    x, y, n, max_coeff = [int(k) for k in S[0:4]]
+    return x, y, n, max_coeff, S[4], S[5]
+
+
+def msg_decode(header, body, dtype = np.float64):
+    # input: string      - message header line
+    # input: string list - message body lines, up to the one holding '/'
+    # input: dtype       - float type of the returned DFT
+    # output: float array - DFT, max_coeff, template, dtg
+    x, y, n, max_coeff, dtg, template = msg_header(header)
+
+    # loop messages (see loopdata_write) carry more frames after the first body
+    for k, m in enumerate(body):
+        if '/' in m:
+            body = body[:k + 1]
+            break
+
+    dft_flat = msgbody_read(body)
+    rows, cols = dft_index(x, n)
+
+    k = min(len(dft_flat), len(rows))
+    dft = np.zeros((x,y), dtype = dtype)
+    dft[rows[:k], cols[:k]] = coeff_unround_array(dft_flat[:k])
             
-    return dft, max_coeff, template, dtg
\ No newline at end of file
+    return dft, max_coeff, template, dtg
+
+
+def msg_split(msg):
+    # input: string - VLF ARGUS message
+    # output: header line, body lines (every frame of a loop message)
+    header, ends = None, 0
+    body = []
+
+    for m in msg.splitlines():
+        if header is None:
+            if msg_marker(m):
+                header = m
+                ends = 2 * msg_loop_frames(m) - 1
+
+        elif ends > 0:
+            body.append(m)
+            if '/' in m: ends -= 1
+
+    if header is None:
+        raise ValueError('No ARGUS message header (A1R1G2U3S5) found')
+
+    return header, body
+
+
+def msg_read(msg, dtype = np.float64):
+    # input: string - VLF ARGUS message
+    # input: dtype  - float type of the returned DFT
+    # output: float array - DFT
+    return msg_decode(*msg_split(msg), dtype)
+
+
+def msg_loop_frames(header):
+    # input: string - message header line
+    # output: int   - number of frames of a loop message (the L<frames>
+    #                 field after the marker), 1 for a single chart
+    for field in header.split(msg_marker(header) or MSG_HEADER, 1)[-1].split('/'):
+        if field[:1] == 'L' and field[1:].isdigit(): return int(field[1:])
+
+    return 1
+
+
+def msg_split_frames(body):
+    # input: string list - body lines of a loop message
+    # output: list of (max_coeff, lines) - each frame's body; max_coeff is
+    #         None for the first frame, whose value is in the header
+    out = []
+    lines = []
+    frame_max = None
+    frame_line = False
+
+    for m in body:
+        if frame_line:
+            S = m.split('/')
+            if not S[0].startswith('F') or len(S) < 3:
+                raise ValueError(f"Corrupt loop frame line: {m}")
+            frame_max = int(S[1])
+            frame_line = False
+            continue
+
+        lines.append(m)
+        if '/' in m:
+            out.append((frame_max, lines))
+            lines = []
+            frame_line = True
+
+    return out
+
+
+def residual_write(target, recon):
+    # input: float array  - coefficients to send, in message order
+    # input: float array  - the decoder's reconstruction they are coded against
+    # output: string      - message body of the quantized difference; trailing
+    #                       zeros are left out and no change is a single '/'
+    # output: float array - the decoder's reconstruction after reading it
+    q = coeff_round_array(np.clip(target - recon, -1000, 1000))
+    recon = recon + coeff_unround_array(q)
+
+    nonzero = np.flatnonzero(q)
+    q = q[:nonzero[-1] + 1] if len(nonzero) else q[:0]
+    return (msgdata_pack(q.tolist()) if len(q) else '/\n'), recon
+
+
+def residual_read(lines, recon):
+    # input: string list  - message body lines written by residual_write
+    # input: float array  - reconstruction the body was coded against
+    # output: float array - reconstruction after reading it
+    q = msgbody_read(lines)
+    m = min(len(q), len(recon))
+    step = np.zeros(len(recon))
+    step[:m] = coeff_unround_array(q[:m])
+    return recon + step
+
+
+def loopdata_write(frames, max_coeffs):
+    # input: list of float arrays - coefficients of every frame in message
+    #                               order (see dft_index), normalized so that
+    #                               the first frame's largest one is 1000
+    # input: int list             - max_coeff of every frame
+    # output: string              - loop message body
+    # The first frame is coded as in msgdata_write. Every later frame codes
+    # the difference to the decoder's reconstruction of the frame before it
+    # (closed loop, so quantization errors do not build up, see
+    # residual_write), preceded by a F<k>/<max_coeff>/ line.
+    out = []
+    recon = None
+
+    for k, target in enumerate(frames):
+        if recon is None:
+            q = coeff_round_array(target)
+            recon = coeff_unround_array(q)
+            out.append(msgdata_pack(q.tolist()))
+            continue
+
+        lines, recon = residual_write(target, recon)
+        out.append(f"F{k}/{max_coeffs[k]}/\n")
+        out.append(lines)
+
+    return ''.join(out)
+
+
+def msg_decode_loop(header, body, dtype = np.float64):
+    # input: string      - loop message header line
+    # input: string list - message body lines of every frame
+    # input: dtype       - float type of the returned DFTs
+    # output: list of (DFT, max_coeff) per frame, template, dtg
+    x, y, n, max_coeff, dtg, template = msg_header(header)
+    rows, cols = dft_index(x, n)
+
+    frames = []
+    recon = np.zeros(len(rows))
+    for k, (frame_max, lines) in enumerate(msg_split_frames(body)):
+        recon = residual_read(lines, recon)
+
+        dft = np.zeros((x,y), dtype = dtype)
+        dft[rows, cols] = recon
+        frames.append((dft, max_coeff if k == 0 else frame_max))
+
+    return frames, template, dtg
+
+
+def msg_delta_base(header):
+    # input: string - message header line
+    # output: string - DTG of the chart a delta message is coded against (the
+    #                  D<dtg> field after MSG_DELTA_HEADER), None for a full message
+    if msg_marker(header) != MSG_DELTA_HEADER: return None
+
+    for field in header.split(MSG_DELTA_HEADER, 1)[-1].split('/'):
+        if field[:1] == 'D' and len(field) > 1: return field[1:]
+
+    raise ValueError(f"Delta message header without a base DTG: {header}")
+
+
+def msg_decode_delta(header, body, base, dtype = np.float64):
+    # input: string      - delta message header line
+    # input: string list - message body lines, up to the one holding '/'
+    # input: float array - stored coefficients of the base chart, in message order
+    # input: dtype       - float type of the returned DFT
+    # output: float array - DFT, max_coeff, template, dtg, and the
+    #         reconstructed coefficients in message order
+    x, y, n, max_coeff, dtg, template = msg_header(header)
+    rows, cols = dft_index(x, n)
+
+    for k, m in enumerate(body):
+        if '/' in m:
+            body = body[:k + 1]
+            break
+
+    recon = residual_read(body, np.asarray(base, dtype = np.float64))
+    dft = np.zeros((x,y), dtype = dtype)
+    dft[rows, cols] = recon
+
+    return dft, max_coeff, template, dtg, recon
+
+
+def iter_messages(lines, max_body_lines = 1000):
+    # input: iterable of strings - text lines, e.g. an open file; read lazily
+    # input: int                 - bodies longer than this (per frame) are
+    #                              dropped as corrupt
+    # output: generator of (header, body) - each message as soon as its body
+    #         line holding '/' is read; only the current message is kept.
+    #         A header, or a line with characters outside char_list (such as
+    #         the preamble of the next message), seen before the body ends
+    #         drops the unterminated message. The body of a loop message
+    #         holds every frame (see loopdata_write).
+    body_chars = set(char_list())
+    header, body = None, []
+
+    for m in lines:
+        m = m.rstrip('\r\n')
+        if msg_marker(m):
+            header, body = m, []
+            # each frame after the first adds a frame line and a body
+            frames = msg_loop_frames(m)
+            ends = 2 * frames - 1
+
+        elif header is not None:
+            body.append(m)
+            if '/' in m:
+                ends -= 1
+                if ends == 0:
+                    yield header, body
+                    header, body = None, []
+            elif len(body) > max_body_lines * frames or not set(m) <= body_chars:
+                header, body = None, []